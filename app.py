@@ -16,8 +16,16 @@ if os.environ.get('GEVENT_PATCH') != 'false':
         gevent.monkey.patch_all()
     except ImportError:
         pass
+    else:
+        # psycopg2 is a C extension that monkey-patching can't reach; this
+        # makes its socket waits yield to other greenlets too
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            pass
 
-from flask import Flask, render_template
+from flask import Flask, render_template, request
 from flask_login import LoginManager
 from flask_socketio import SocketIO
 from dotenv import load_dotenv
@@ -29,13 +37,18 @@ from config import get_config
 from models import db, User
 
 # Initialize Flask-Login and Flask-Mail
-from extensions import login_manager, oauth, socketio
+from extensions import login_manager, oauth, socketio, cache, limiter, orjson, ORJSONProvider
 from email_utils import mail
 from flask_compress import Compress
+import pytz
 
 # Initialize Compress
 compress = Compress()
 
+# Timezones used by the to_ist template filter (built once, not per render)
+_UTC = pytz.UTC
+_IST = pytz.timezone('Asia/Kolkata')
+
 def create_app(config_name='default'):
     """
     Application Factory Function
@@ -53,11 +66,25 @@ def create_app(config_name='default'):
     
     # Create Flask application instance
     app = Flask(__name__)
+    if orjson is not None:
+        # jsonify()/request.get_json() through orjson (same output as the default)
+        app.json = ORJSONProvider(app)
     
     # Load configuration
     config_class = get_config(config_name)
     app.config.from_object(config_class)
     
+    # Connection pool sizing must come from config (see Config.SQLALCHEMY_ENGINE_OPTIONS)
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        raise RuntimeError('SQLALCHEMY_ENGINE_OPTIONS missing from config')
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # In-memory SQLite uses SingletonThreadPool, which rejects the
+        # QueuePool-only sizing/wait options; file databases don't need them
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            k: v for k, v in app.config['SQLALCHEMY_ENGINE_OPTIONS'].items()
+            if k not in ('pool_size', 'max_overflow', 'pool_timeout')
+        }
+    
     # Fix for Render reverse proxy - ensures correct https:// URLs for OAuth
     from werkzeug.middleware.proxy_fix import ProxyFix
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
@@ -65,15 +92,28 @@ def create_app(config_name='default'):
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
-    socketio.init_app(app)
+    # With several gunicorn workers, Socket.IO events are relayed through Redis
+    socketio.init_app(app, message_queue=app.config.get('REDIS_URL'))
     oauth.init_app(app)
     mail.init_app(app)
     compress.init_app(app)
+    cache.init_app(app)
+    limiter.init_app(app)
+    
+    # Payment services are shared by all requests (Unit-9: Composition);
+    # each thread/greenlet still gets its own SQLite connection
+    from payment_system import PaymentGateway, WalletManager
+    app.payment_gateway = PaymentGateway()
+    app.wallet_manager = WalletManager(payment_gateway=app.payment_gateway)
 
     # Performance: Cache Static Files for 1 Year
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
     app.config['COMPRESS_MIMETYPES'] = ['text/html', 'text/css', 'text/javascript', 'application/json', 'application/javascript']
-    app.config['COMPRESS_LEVEL'] = 6
+    if app.config.get('STATIC_SERVED_EXTERNALLY'):
+        # CSS/JS are pre-compressed by compress_static.py and served by the proxy
+        app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json']
+    # Dynamic responses: level 4 is much cheaper than 6 for nearly the same size
+    app.config['COMPRESS_LEVEL'] = 4
     app.config['COMPRESS_MIN_SIZE'] = 500
 
     # Register Google OAuth
@@ -108,7 +148,8 @@ def create_app(config_name='default'):
         Returns:
             User: User object or None
         """
-        return User.query.get(int(user_id))
+        # Identity-map lookup; Flask-Login caches the result for the rest of the request
+        return db.session.get(User, int(user_id))
     
     # Register blueprints (routes)
     from routes import main_bp, auth_bp, service_bp, user_bp, admin_bp, api_bp, availability_bp
@@ -125,6 +166,44 @@ def create_app(config_name='default'):
     from routes_chat import chat_bp
     app.register_blueprint(chat_bp, url_prefix='/chat')
     
+    # Build the Groq client at boot so the first chat request doesn't pay for it
+    if app.config.get('ENABLE_ASKVERA'):
+        from chat_manager import chat_manager
+        with app.app_context():
+            chat_manager.setup()
+    
+    # Compile email templates once instead of on every send
+    from email_utils import precompile_email_templates
+    precompile_email_templates(app)
+    
+    # Performance: far-future caching for static files
+    # Safe because code assets are linked with ?v=ASSET_VERSION (see asset_version below)
+    static_prefix = (app.static_url_path or '/static') + '/'
+    
+    @app.after_request
+    def cache_static_files(response):
+        """Mark static responses as publicly cacheable and immutable"""
+        if request.path.startswith(static_prefix) and response.status_code == 200:
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+            response.headers.pop('Pragma', None)
+            response.headers.pop('Expires', None)
+        return response
+    
+    if app.config.get('STATIC_SERVED_EXTERNALLY'):
+        # Static files are served by the proxy; url_for('static') still builds URLs
+        @app.before_request
+        def reject_static_files():
+            """Return 404 for static paths that reached Flask"""
+            if request.path.startswith(static_prefix):
+                return 'Static files are served by the proxy', 404
+    
+    @app.context_processor
+    def inject_asset_version():
+        """Expose asset_version to templates for url_for('static', ..., v=asset_version)"""
+        return {'asset_version': app.config['ASSET_VERSION']}
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found_error(error):
@@ -142,34 +221,47 @@ def create_app(config_name='default'):
     if upload_folder and not os.path.exists(upload_folder):
         os.makedirs(upload_folder)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
-        
-        # Create default admin user if not exists
-        from init_db import create_default_admin, seed_categories
-        create_default_admin(app)
-        seed_categories()
+    # Database setup runs once per deploy (flask init-db), not on every worker boot
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables, the default admin user, and categories"""
+        from init_db import init_database
+        init_database(app)
     
     # Register Socket.IO events
     from events import register_socketio_events
     register_socketio_events(socketio)
     
     # Template filter for IST conversion
-    from datetime import timedelta
-    import pytz
     @app.template_filter('to_ist')
     def to_ist(dt):
         if dt:
             # If datetime is naive (no timezone), assume UTC
             if dt.tzinfo is None:
-                utc_tz = pytz.UTC
-                dt = utc_tz.localize(dt)
+                dt = dt.replace(tzinfo=_UTC)
             # Convert to IST
-            ist_tz = pytz.timezone('Asia/Kolkata')
-            return dt.astimezone(ist_tz)
+            return dt.astimezone(_IST)
         return dt
     
+    @app.template_filter('to_ist_list')
+    def to_ist_list(dts):
+        """
+        Convert a whole sequence of datetimes to IST in one filter call
+        
+        Usage: {% set times = messages|map(attribute='created_at')|to_ist_list %}
+        """
+        out = []
+        append = out.append
+        utc, ist = _UTC, _IST
+        for dt in dts:
+            if not dt:
+                append(dt)
+                continue
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=utc)
+            append(dt.astimezone(ist))
+        return out
+    
     return app
 
 
@@ -187,6 +279,10 @@ if __name__ == '__main__':
     # Create application instance
     app = create_app(config_name)
     
+    # Development convenience: make sure tables and default data exist
+    from init_db import init_database
+    init_database(app)
+    
     # Run development server with SocketIO
     # In production, use a WSGI server like Gunicorn or uWSGI
     socketio.run(
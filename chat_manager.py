@@ -2,15 +2,61 @@ import os
 from groq import Groq
 from flask import current_app
 import logging
+import threading
 import traceback
+from functools import lru_cache
+
+# Starter questions shown in AskVera, per role
+_ADMIN_SUGGESTIONS = (
+    "How can I manage users on this platform?",
+    "How do I add or update services?",
+    "How can I manage service categories?",
+    "How do I view or handle orders?",
+    "What should I configure first as an admin?"
+)
+
+# Normal User (client/provider/guest)
+_USER_SUGGESTIONS = (
+    "How do I find the right service for me?",
+    "How can I book a service?",
+    "How do I manage my bookings?",
+    "How can I contact a service provider?",
+    "How do I track my orders?"
+)
+
+_SYSTEM_PROMPT_TEMPLATE = (
+    "You are AskVera, the official intelligent assistant of the SkillVerse platform. "
+    "Role: {role}. "
+    "Tone: Professional, Honest, Simple. "
+    "Context: {page}. "
+    "AVAILABLE FEATURES: User management, Services listing, Categories, Orders, Bookings, Availability management. "
+    "RULES: "
+    "1. ONLY suggest/discuss existing features. Do NOT invent analytics, numbers, or future integrations. "
+    "2. If data is not provided, say 'Data not available yet'. If count is zero, say 'No records found yet'. "
+    "3. Do NOT repeat visible dashboard numbers. Explain HOW to find/use features instead. "
+    "4. Be helpful but strictly realistic about the platform capabilities."
+)
+
+@lru_cache(maxsize=64)
+def _system_prompt(role, page):
+    # Only role and page vary, so each (role, page) prompt is built once
+    return _SYSTEM_PROMPT_TEMPLATE.format(role=role, page=page)
 
 class ChatManager:
     def __init__(self):
         self.model = None
         self._setup_done = False
         self._init_error = None
+        # Serializes client creation so concurrent requests build one Groq client
+        self._lock = threading.Lock()
 
     def setup(self):
+        with self._lock:
+            if self._setup_done:
+                return
+            self._setup()
+
+    def _setup(self):
         api_key = current_app.config.get("GROQ_API_KEY") or os.environ.get("GROQ_API_KEY")
         
         if not api_key:
@@ -30,7 +76,8 @@ class ChatManager:
             logging.error(f"AskVera init failed: {e}")
             traceback.print_exc()
 
-    def get_response(self, user_message, context, user_identity, user_role="guest"):
+    def _ensure_model(self):
+        """Return an error payload if the AI client can't be used, else None."""
         if not current_app.config.get("ENABLE_ASKVERA", False):
             return {"error": "AskVera is disabled.", "fallback": True}
 
@@ -41,32 +88,30 @@ class ChatManager:
             err_detail = self._init_error or "Unknown error"
             logging.error(f"AskVera: Model still None after setup. Error: {err_detail}")
             return {"error": f"AI service unavailable ({err_detail}).", "fallback": True}
+        return None
+
+    def _create_completion(self, user_message, context, user_role, stream=False):
+        system_prompt = _system_prompt(user_role, str(context.get('page', 'unknown')))
+        
+        return self.model.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.3,
+            max_tokens=300,
+            top_p=0.9,
+            stream=stream
+        )
+
+    def get_response(self, user_message, context, user_identity, user_role="guest"):
+        error = self._ensure_model()
+        if error:
+            return error
 
         try:
-            system_prompt = (
-                f"You are AskVera, the official intelligent assistant of the SkillVerse platform. "
-                f"Role: {user_role}. "
-                f"Tone: Professional, Honest, Simple. "
-                f"Context: {context.get('page', 'unknown')}. "
-                f"AVAILABLE FEATURES: User management, Services listing, Categories, Orders, Bookings, Availability management. "
-                f"RULES: "
-                f"1. ONLY suggest/discuss existing features. Do NOT invent analytics, numbers, or future integrations. "
-                f"2. If data is not provided, say 'Data not available yet'. If count is zero, say 'No records found yet'. "
-                f"3. Do NOT repeat visible dashboard numbers. Explain HOW to find/use features instead. "
-                f"4. Be helpful but strictly realistic about the platform capabilities."
-            )
-            
-            response = self.model.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.3,
-                max_tokens=300,
-                top_p=0.9
-            )
-            
+            response = self._create_completion(user_message, context, user_role)
             ai_text = response.choices[0].message.content.strip()
             return {"response": ai_text, "suggestions": self.get_initial_suggestions(user_role)[:3]}
                 
@@ -75,22 +120,34 @@ class ChatManager:
             traceback.print_exc()
             return {"error": "I'm having trouble connecting right now.", "fallback": True}
 
+    def get_response_stream(self, user_message, context, user_identity, user_role="guest"):
+        """
+        Generator version of get_response: yields events as the model writes.
+        
+        Yields {"token": text} for each chunk, then {"done": True, "suggestions": [...]},
+        or a single {"error": ..., "fallback": True} if the call fails.
+        """
+        error = self._ensure_model()
+        if error:
+            yield error
+            return
+
+        try:
+            stream = self._create_completion(user_message, context, user_role, stream=True)
+            for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    yield {"token": token}
+        except Exception as e:
+            print(f"ChatManager Error: {e}")
+            traceback.print_exc()
+            yield {"error": "I'm having trouble connecting right now.", "fallback": True}
+            return
+
+        yield {"done": True, "suggestions": self.get_initial_suggestions(user_role)[:3]}
+
     def get_initial_suggestions(self, role):
-        if role == 'admin':
-            return [
-                "How can I manage users on this platform?",
-                "How do I add or update services?",
-                "How can I manage service categories?",
-                "How do I view or handle orders?",
-                "What should I configure first as an admin?"
-            ]
-        else: # Normal User (client/provider/guest)
-            return [
-                "How do I find the right service for me?",
-                "How can I book a service?",
-                "How do I manage my bookings?",
-                "How can I contact a service provider?",
-                "How do I track my orders?"
-            ]
+        # Shared immutable tuples - no new list per call
+        return _ADMIN_SUGGESTIONS if role == 'admin' else _USER_SUGGESTIONS
 
 chat_manager = ChatManager()
@@ -0,0 +1,83 @@
+"""
+Static Asset Pre-compression Script
+
+This script:
+1. Walks the static/ folder
+2. Writes a .gz (and .br when brotli is installed) file next to each text asset
+3. Skips files whose compressed copies are already up to date
+
+Run once at build/deploy time so the web server can send the
+pre-compressed files (Nginx: gzip_static / brotli_static) instead of
+compressing them on every request.
+
+Author: SkillVerse Team
+Purpose: Move static compression from request time to build time
+"""
+
+import os
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional - only .gz files are written
+    brotli = None
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(basedir, 'static')
+
+# Images/fonts are already compressed; only text assets benefit
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.html', '.json', '.txt', '.xml'}
+
+# Files smaller than this are not worth compressing (matches COMPRESS_MIN_SIZE)
+MIN_SIZE = 500
+
+
+def write_if_stale(source, target, data):
+    """
+    Write compressed data only when the target is missing or older than the source
+    
+    Args:
+        source (str): Path of the original asset
+        target (str): Path of the compressed copy
+        data (bytes): Compressed content
+    """
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return False
+    with open(target, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def compress_static(static_dir=STATIC_DIR):
+    """
+    Pre-compress every text asset under static_dir
+    
+    Args:
+        static_dir (str): Folder to walk (default: static/)
+        
+    Returns:
+        int: Number of compressed files written
+    """
+    written = 0
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < MIN_SIZE:
+                continue
+            
+            if write_if_stale(path, path + '.gz', gzip.compress(data, 9)):
+                written += 1
+            if brotli and write_if_stale(path, path + '.br', brotli.compress(data, quality=11)):
+                written += 1
+    return written
+
+
+if __name__ == '__main__':
+    count = compress_static()
+    print(f"[OK] Wrote {count} pre-compressed files")
+    if brotli is None:
+        print("[INFO] brotli not installed - skipped .br files")
@@ -37,6 +37,20 @@ class Config:
     # Disable SQLAlchemy modification tracking (saves memory)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool: reuse open connections instead of paying the
+    # TCP + TLS + auth handshake on every request.
+    # Each gevent worker serves many requests at once, so the pool is sized
+    # per worker for that concurrency; with several workers point
+    # DATABASE_URL at PgBouncer (see pgbouncer.ini) so the pools share a
+    # bounded set of server connections.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 20)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 40)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),  # Fail fast instead of queueing forever
+        'pool_pre_ping': True,   # Drop connections closed by the server
+        'pool_recycle': 1800     # Recycle connections every 30 minutes
+    }
+    
     # Session Configuration
     # Sessions will expire after 7 days of inactivity
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -47,9 +61,31 @@ class Config:
     UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     
+    # Static asset version appended to asset URLs (?v=...) for cache busting.
+    # Set GIT_SHA at deploy time so browsers fetch fresh CSS/JS after each release.
+    ASSET_VERSION = os.environ.get('GIT_SHA', 'dev')
+    
+    # Set when Nginx/CDN serves /static/ directly (see nginx.conf).
+    # Flask then refuses static paths so a misconfigured proxy fails fast.
+    STATIC_SERVED_EXTERNALLY = os.environ.get('STATIC_SERVED_EXTERNALLY', 'false').lower() == 'true'
+    
+    # Cache Configuration (Flask-Caching)
+    # Redis is shared by all workers; without REDIS_URL each process keeps its own cache
+    REDIS_URL = os.environ.get('REDIS_URL')
+    CACHE_TYPE = 'RedisCache' if REDIS_URL else 'SimpleCache'
+    CACHE_REDIS_URL = REDIS_URL
+    CACHE_DEFAULT_TIMEOUT = 60
+    # Per-release namespace: cached pages embed ?v=ASSET_VERSION links
+    CACHE_KEY_PREFIX = f"skillverse:{os.environ.get('GIT_SHA', 'dev')}:"
+    
+    # Rate limiting (Flask-Limiter): counters shared through Redis when available
+    RATELIMIT_STORAGE_URI = REDIS_URL or 'memory://'
+    AUTH_RATE_LIMIT = os.environ.get('AUTH_RATE_LIMIT', '5/minute')
+    
     # Pagination
     # Number of items to display per page
     ITEMS_PER_PAGE = 12
+    SERVICES_PER_PAGE = 24  # Service browse page
     
     # Admin Configuration
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL') or 'admin@skillverse.com'
@@ -119,6 +155,9 @@ class ProductionConfig(Config):
     
     # Disable SQL query logging in production
     SQLALCHEMY_ECHO = False
+    
+    # Templates never change on a running server - skip Jinja's reload checks
+    TEMPLATES_AUTO_RELOAD = False
 
 
 class TestingConfig(Config):
@@ -138,6 +177,9 @@ class TestingConfig(Config):
     
     # Disable CSRF protection in testing
     WTF_CSRF_ENABLED = False
+    
+    # Tests log in repeatedly from one address
+    RATELIMIT_ENABLED = False
 
 
 # Dictionary to easily access configurations
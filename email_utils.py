@@ -5,16 +5,58 @@ This module handles all email sending functionality using Flask-Mail.
 Provides utility functions to send HTML emails for various events.
 """
 
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from flask import render_template, current_app
 from flask_mail import Mail, Message
-from threading import Thread
 
 mail = Mail()
 
+# Bounded pool of background senders shared by every email.
+# Under gevent (monkey-patched in app.py) these workers are greenlets,
+# so SMTP socket I/O yields cooperatively instead of pinning OS threads.
+MAIL_WORKERS = 8
+_mail_executor = ThreadPoolExecutor(max_workers=MAIL_WORKERS, thread_name_prefix='mail')
+
+# Flush queued emails before the interpreter exits
+atexit.register(_mail_executor.shutdown, wait=True)
+
+# Email templates compiled once at startup (see precompile_email_templates)
+EMAIL_TEMPLATES = [
+    'welcome',
+    'reset_password',
+    'order_placed_customer',
+    'order_placed_provider',
+    'order_accepted_customer',
+    'order_accepted_provider',
+    'order_completed_customer',
+    'order_completed_provider',
+    'booking_confirmation',
+    'booking_rejection'
+]
+_TEMPLATES = {}
+
+
+def precompile_email_templates(app):
+    """
+    Compile all email templates once and keep them in memory
+    
+    Skips Jinja's per-call loader lookup and file stat when an email
+    is rendered. Templates that fail to load are rendered by name instead.
+    
+    Args:
+        app: Flask application instance
+    """
+    for name in EMAIL_TEMPLATES:
+        try:
+            _TEMPLATES[name] = app.jinja_env.get_template(f'emails/{name}.html')
+        except Exception as e:
+            app.logger.error(f"Failed to precompile email template '{name}': {str(e)}")
+
 
 def send_async_email(app, msg):
     """
-    Send email in a separate thread (fallback for development)
+    Send email on a background mail worker
     
     Args:
         app: Flask application instance
@@ -27,6 +69,50 @@ def send_async_email(app, msg):
             app.logger.error(f"Failed to send email: {str(e)}")
 
 
+def send_async_emails_bulk(app, messages):
+    """
+    Send several emails over one SMTP connection on a background mail worker
+    
+    Args:
+        app: Flask application instance
+        messages: List of Flask-Mail Message objects
+    """
+    with app.app_context():
+        try:
+            with mail.connect() as conn:
+                for msg in messages:
+                    conn.send(msg)
+        except Exception as e:
+            app.logger.error(f"Failed to send emails: {str(e)}")
+
+
+def build_email(subject, recipient, template, **kwargs):
+    """
+    Build HTML email message from template
+    
+    Must be called while the app/request context is alive so the
+    template can be rendered (url_for, config, etc.).
+    
+    Args:
+        subject (str): Email subject line
+        recipient (str): Recipient email address
+        template (str): Template file name (without .html extension)
+        **kwargs: Additional context variables for the template
+        
+    Returns:
+        Message: Flask-Mail Message object
+    """
+    msg = Message(
+        subject=subject,
+        recipients=[recipient],
+        sender=current_app.config['MAIL_DEFAULT_SENDER']
+    )
+    
+    # Render HTML template (precompiled when available)
+    msg.html = render_template(_TEMPLATES.get(template) or f'emails/{template}.html', **kwargs)
+    return msg
+
+
 def send_email(subject, recipient, template, **kwargs):
     """
     Send HTML email using template
@@ -42,21 +128,11 @@ def send_email(subject, recipient, template, **kwargs):
     """
     try:
         app = current_app._get_current_object()
+        msg = build_email(subject, recipient, template, **kwargs)
         
-        msg = Message(
-            subject=subject,
-            recipients=[recipient],
-            sender=app.config['MAIL_DEFAULT_SENDER']
-        )
-        
-        # Render HTML template
-        msg.html = render_template(f'emails/{template}.html', **kwargs)
-        
-        # On production (gunicorn + gevent), send synchronously for reliability
-        # On development, use threading
-        # Send email asynchronously in a background thread to prevent blocking
+        # Queue the email on the bounded mail worker pool to prevent blocking
         # This resolves the issue of long loading times (60s+) during registration
-        Thread(target=send_async_email, args=(app, msg)).start()
+        _mail_executor.submit(send_async_email, app, msg)
         
         return True
     except Exception as e:
@@ -66,6 +142,62 @@ def send_email(subject, recipient, template, **kwargs):
         return False
 
 
+def send_emails_bulk(messages):
+    """
+    Queue several prepared emails as a single job sharing one SMTP connection
+    
+    Args:
+        messages (list): Flask-Mail Message objects (see build_email)
+        
+    Returns:
+        bool: True if emails were queued, False otherwise
+    """
+    try:
+        app = current_app._get_current_object()
+        _mail_executor.submit(send_async_emails_bulk, app, list(messages))
+        return True
+    except Exception as e:
+        current_app.logger.error(f"Error queueing emails: {str(e)}")
+        return False
+
+
+def send_order_email_pair(order, customer_subject, customer_template,
+                          provider_subject, provider_template):
+    """
+    Send the customer and provider emails for an order event together
+    
+    Both templates are rendered now (while the request context is alive)
+    and delivered over one SMTP connection by the mail worker.
+    
+    Args:
+        order: Order object with buyer, seller, and service relationships loaded
+        customer_subject (str): Subject for the customer email
+        customer_template (str): Template name for the customer email
+        provider_subject (str): Subject for the provider email
+        provider_template (str): Template name for the provider email
+        
+    Returns:
+        bool: True if emails were queued, False otherwise
+    """
+    context = {
+        'order': order,
+        'customer': order.buyer,
+        'provider': order.seller,
+        'service': order.service
+    }
+    
+    try:
+        messages = [
+            build_email(customer_subject, order.buyer.email, customer_template, **context),
+            build_email(provider_subject, order.seller.email, provider_template, **context)
+        ]
+    except Exception as e:
+        current_app.logger.error(f"Error creating order emails: {str(e)}")
+        return False
+    
+    return send_emails_bulk(messages)
+
+
 def send_welcome_email(user):
     """
     Send welcome email to new user
@@ -88,26 +220,12 @@ def send_order_placed_emails(order):
     Args:
         order: Order object with buyer, seller, and service relationships loaded
     """
-    # Email to customer
-    send_email(
-        subject='Your order has been sent successfully',
-        recipient=order.buyer.email,
-        template='order_placed_customer',
-        order=order,
-        customer=order.buyer,
-        provider=order.seller,
-        service=order.service
-    )
-    
-    # Email to provider
-    send_email(
-        subject='New order received',
-        recipient=order.seller.email,
-        template='order_placed_provider',
-        order=order,
-        customer=order.buyer,
-        provider=order.seller,
-        service=order.service
+    return send_order_email_pair(
+        order,
+        customer_subject='Your order has been sent successfully',
+        customer_template='order_placed_customer',
+        provider_subject='New order received',
+        provider_template='order_placed_provider'
     )
 
 
@@ -118,26 +236,12 @@ def send_order_accepted_emails(order):
     Args:
         order: Order object
     """
-    # Email to customer
-    send_email(
-        subject='Your order has been accepted',
-        recipient=order.buyer.email,
-        template='order_accepted_customer',
-        order=order,
-        customer=order.buyer,
-        provider=order.seller,
-        service=order.service
-    )
-    
-    # Email to provider
-    send_email(
-        subject='Order accepted successfully',
-        recipient=order.seller.email,
-        template='order_accepted_provider',
-        order=order,
-        customer=order.buyer,
-        provider=order.seller,
-        service=order.service
+    return send_order_email_pair(
+        order,
+        customer_subject='Your order has been accepted',
+        customer_template='order_accepted_customer',
+        provider_subject='Order accepted successfully',
+        provider_template='order_accepted_provider'
     )
 
 
@@ -148,26 +252,12 @@ def send_order_completed_emails(order):
     Args:
         order: Order object
     """
-    # Email to customer
-    send_email(
-        subject='Your order has been completed',
-        recipient=order.buyer.email,
-        template='order_completed_customer',
-        order=order,
-        customer=order.buyer,
-        provider=order.seller,
-        service=order.service
-    )
-    
-    # Email to provider
-    send_email(
-        subject='Order marked as completed',
-        recipient=order.seller.email,
-        template='order_completed_provider',
-        order=order,
-        customer=order.buyer,
-        provider=order.seller,
-        service=order.service
+    return send_order_email_pair(
+        order,
+        customer_subject='Your order has been completed',
+        customer_template='order_completed_customer',
+        provider_subject='Order marked as completed',
+        provider_template='order_completed_provider'
     )
 
 
@@ -1,8 +1,43 @@
 from flask_login import LoginManager
 from authlib.integrations.flask_client import OAuth
 from flask_socketio import SocketIO
+from flask_caching import Cache
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask.json.provider import DefaultJSONProvider
+
+# Fast C JSON codec for jsonify() when installed (optional dependency)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Initialize extensions
 login_manager = LoginManager()
 oauth = OAuth()
 socketio = SocketIO(cors_allowed_origins="*")
+cache = Cache()
+# Client IP is the real one: app.py wraps the app in ProxyFix
+limiter = Limiter(key_func=get_remote_address)
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson
+    
+    Output matches the default provider: keys sorted, and anything orjson
+    doesn't encode itself (datetimes as HTTP dates, Decimal, ...) goes
+    through DefaultJSONProvider.default.
+    """
+    
+    OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+    
+    def dumps(self, obj, **kwargs):
+        option = self.OPTIONS | (orjson.OPT_INDENT_2 if kwargs.get('indent') else 0)
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            # e.g. the session serializer's object_hook, which orjson lacks
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,32 @@
+"""
+Gunicorn Configuration for SkillVerse
+
+Used by the Procfile: gunicorn "app:create_app('production')" -c gunicorn.conf.py
+
+gevent workers let one process overlap many requests that are waiting on
+I/O (database, SMTP, Google OAuth, Groq). app.py monkey-patches the
+standard library (and psycopg2, through psycogreen) before anything else
+is imported, so database, SMTP and HTTP calls all yield cooperatively.
+"""
+
+import os
+import multiprocessing
+
+# Bind address: Render/Heroku provide PORT; behind Nginx on the same host a
+# Unix socket avoids TCP overhead (GUNICORN_BIND=unix:/tmp/skillverse.sock)
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Socket.IO keeps per-connection state in the worker process. More than one
+# worker needs a shared message queue (REDIS_URL, see app.py) and sticky
+# sessions at the proxy, so without Redis we stay on a single worker.
+if os.environ.get('REDIS_URL'):
+    workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+else:
+    workers = 1
+
+# Keep proxy connections open between requests
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
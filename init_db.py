@@ -217,6 +217,159 @@ def seed_sample_data():
         print(f"[OK] Seeded {len(sample_services)} sample services")
 
 
+def upgrade_foreign_keys():
+    """
+    Bring ON DELETE rules of existing tables in line with the models
+    
+    db.create_all() never alters tables that already exist, so databases
+    created before the models declared ondelete= keep their old foreign
+    keys. On PostgreSQL each mismatching constraint is dropped and added
+    again; SQLite cannot alter constraints, so it is only reported there.
+    
+    Returns:
+        int: Number of constraints rebuilt
+    """
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    is_postgres = db.engine.dialect.name == 'postgresql'
+    rebuilt = 0
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        wanted = {
+            tuple(fk.parent.name for fk in constraint.elements): constraint.ondelete
+            for constraint in table.foreign_key_constraints if constraint.ondelete
+        }
+        for fk in inspector.get_foreign_keys(table.name):
+            columns = tuple(fk['constrained_columns'])
+            ondelete = wanted.get(columns)
+            current = (fk.get('options') or {}).get('ondelete')
+            if not ondelete or (current or '').upper() == ondelete.upper():
+                continue
+            if not is_postgres:
+                print(f"[WARN] {table.name}.{', '.join(columns)} lacks ON DELETE {ondelete}; recreate the table to apply it")
+                continue
+            with db.engine.begin() as conn:
+                conn.execute(db.text(f'ALTER TABLE {table.name} DROP CONSTRAINT {fk["name"]}'))
+                conn.execute(db.text(
+                    f'ALTER TABLE {table.name} ADD CONSTRAINT {fk["name"]} '
+                    f'FOREIGN KEY ({", ".join(columns)}) '
+                    f'REFERENCES {fk["referred_table"]} ({", ".join(fk["referred_columns"])}) '
+                    f'ON DELETE {ondelete}'
+                ))
+            rebuilt += 1
+    
+    if rebuilt:
+        print(f"[OK] Rebuilt {rebuilt} foreign key constraint(s)")
+    return rebuilt
+
+
+# Service counter columns and the child-table aggregate each one mirrors
+SERVICE_COUNTERS = {
+    'favorite_count': 'SELECT COUNT(*) FROM favorites WHERE favorites.service_id = services.id',
+    'review_count': 'SELECT COUNT(*) FROM reviews WHERE reviews.service_id = services.id',
+    'rating_sum': 'SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.service_id = services.id',
+}
+
+
+def upgrade_service_counters():
+    """
+    Add any missing Service counter columns and recount them
+    
+    db.create_all() won't add columns to an existing services table, so
+    older databases get them here. Every column is then recomputed from
+    the favorites/reviews tables, which also repairs counters after rows
+    were edited outside the app.
+    
+    Returns:
+        int: Number of columns added
+    """
+    existing = {column['name'] for column in db.inspect(db.engine).get_columns('services')}
+    missing = [name for name in SERVICE_COUNTERS if name not in existing]
+    
+    with db.engine.begin() as conn:
+        for name in missing:
+            conn.execute(db.text(f'ALTER TABLE services ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0'))
+        assignments = ', '.join(f'{name} = ({query})' for name, query in SERVICE_COUNTERS.items())
+        conn.execute(db.text(f'UPDATE services SET {assignments}'))
+    
+    print(f"[OK] Service counters recounted ({len(missing)} column(s) added)")
+    return len(missing)
+
+
+# Service columns matched by the search box with ILIKE '%term%'
+SEARCH_COLUMNS = ('title', 'description', 'tags')
+
+
+def create_search_indexes():
+    """
+    Add the service search indexes on PostgreSQL
+    
+    A leading-wildcard ILIKE can't use a btree index, so every search
+    scanned the whole services table. GIN indexes with gin_trgm_ops
+    (pg_trgm) serve those same ILIKE filters, so the queries don't
+    change and SQLite (no pg_trgm) keeps working as before. A
+    lower(title) varchar_pattern_ops index serves the autocomplete's
+    prefix LIKE.
+    
+    Returns:
+        bool: True if the indexes exist (PostgreSQL only)
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            for column in SEARCH_COLUMNS:
+                conn.execute(db.text(
+                    f'CREATE INDEX IF NOT EXISTS idx_service_{column}_trgm '
+                    f'ON services USING gin ({column} gin_trgm_ops)'
+                ))
+            conn.execute(db.text(
+                'CREATE INDEX IF NOT EXISTS idx_service_title_prefix '
+                'ON services (lower(title) varchar_pattern_ops)'
+            ))
+    except Exception as e:
+        # CREATE EXTENSION needs a privileged role on some hosts
+        print(f"[WARN] Search indexes not created: {e}")
+        return False
+    
+    print("[OK] Search indexes ready")
+    return True
+
+
+def init_database(app):
+    """
+    Create tables, default admin user, and categories
+    
+    Used by the "flask init-db" command (run once per deploy) so that
+    create_app doesn't hit the database on every worker boot.
+    
+    Args:
+        app: Flask application instance
+    """
+    with app.app_context():
+        db.create_all()
+        print("[OK] Database tables created")
+        
+        # Apply ON DELETE rules to tables created by older versions
+        upgrade_foreign_keys()
+        
+        # Favorite/review totals stored on services
+        upgrade_service_counters()
+        
+        # Indexed substring search (PostgreSQL)
+        create_search_indexes()
+        
+        # Create default admin user if not exists
+        create_default_admin(app)
+        
+        # Seed categories
+        seed_categories()
+
+
 if __name__ == '__main__':
     """
     Run this script directly to initialize database
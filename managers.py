@@ -17,7 +17,9 @@ import random
 from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from models import db, Service, User, Category, Review, Order, Favorite, Notification, Message
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from extensions import cache
+from stats import CATEGORY_STATS_KEY, CATEGORY_STATS_TIMEOUT, CATEGORY_CHOICES_KEY, CATEGORY_CHOICES_TIMEOUT
 
 from flask import current_app
 
@@ -89,26 +91,20 @@ class ServiceManager:
         
         return featured
     
-    def search_services(self, query, filters=None):
+    def build_search_query(self, query, filters=None):
         """
-        Search services with advanced filtering
+        Build the SQL query for active services matching a search
         
-        Algorithm:
-        1. Tokenize search query
-        2. Search in title, description, and tags
-        3. Apply filters (category, price range, etc.)
-        4. Rank results by relevance
+        Filtering and sorting stay in the database; callers add ORDER BY,
+        eager loading, or LIMIT/OFFSET before running it.
         
         Args:
-            query (str): Search query
-            filters (dict): Optional filters (category_id, min_price, max_price, etc.)
+            query (str): Search query (matched against title, description, tags)
+            filters (dict): Optional filters (category_id, min_price, max_price)
             
         Returns:
-            list: Matching Service objects sorted by relevance
+            Query: Unexecuted Service query
         """
-        if not query and not filters:
-            return []
-        
         # Start with all active services
         results = Service.query.filter_by(is_active=True)
         
@@ -134,8 +130,30 @@ class ServiceManager:
             if 'max_price' in filters and filters['max_price']:
                 results = results.filter(Service.price <= filters['max_price'])
         
+        return results
+    
+    def search_services(self, query, filters=None):
+        """
+        Search services with advanced filtering
+        
+        Algorithm:
+        1. Tokenize search query
+        2. Search in title, description, and tags
+        3. Apply filters (category, price range, etc.)
+        4. Rank results by relevance
+        
+        Args:
+            query (str): Search query
+            filters (dict): Optional filters (category_id, min_price, max_price, etc.)
+            
+        Returns:
+            list: Matching Service objects sorted by relevance
+        """
+        if not query and not filters:
+            return []
+        
         # Get all results
-        services = results.all()
+        services = self.build_search_query(query, filters).all()
         
         # Rank by relevance (simple scoring algorithm)
         if query:
@@ -321,8 +339,12 @@ class UserManager:
         """
         if email:
             email = email.lower().strip()
-            
-        user = User.query.filter_by(email=email).first()
+        
+        # Only the columns the login flow reads; the rest load on demand
+        user = User.query.options(load_only(
+            User.id, User.password_hash, User.is_active,
+            User.username, User.full_name, User.user_type
+        )).filter_by(email=email).first()
         
         if user and user.check_password(password):
             return user
@@ -540,6 +562,13 @@ class ReviewSystem:
         )
         
         db.session.add(review)
+        # Keep the service's rating totals in the same commit as the review
+        db.session.execute(
+            db.update(Service)
+            .where(Service.id == service_id)
+            .values(review_count=Service.review_count + 1,
+                    rating_sum=Service.rating_sum + rating)
+        )
         db.session.commit()
         
         return review, None
@@ -555,7 +584,9 @@ class ReviewSystem:
         Returns:
             list: Review objects
         """
+        # Reviewer is loaded in the same query (templates show name/avatar)
         query = Review.query.filter_by(service_id=service_id)\
+                           .options(joinedload(Review.reviewer))\
                            .order_by(Review.created_at.desc())
         
         if limit:
@@ -570,13 +601,16 @@ class ReviewSystem:
         Returns:
             dict: Rating distribution (1-5 stars with counts)
         """
-        reviews = Review.query.filter_by(service_id=service_id).all()
+        # Count per rating in SQL (GROUP BY) instead of loading every review
+        counts = db.session.query(Review.rating, db.func.count(Review.id))\
+                           .filter_by(service_id=service_id)\
+                           .group_by(Review.rating).all()
         
         # Initialize distribution dictionary
         distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
         
-        for review in reviews:
-            distribution[review.rating] += 1
+        for rating, count in counts:
+            distribution[rating] += count
         
         return distribution
 
@@ -599,7 +633,7 @@ class OrderManager:
         """
         self.processing_queue = deque()  # Queue for pending orders
     
-    def create_order(self, service_id, buyer_id, requirements='', scope='', budget_tier='Standard', deadline=None):
+    def create_order(self, service_id, buyer_id, requirements='', scope='', budget_tier='Standard', deadline=None, commit=True):
         """
         Create new order
         
@@ -610,6 +644,8 @@ class OrderManager:
             scope (str): Detailed scope
             budget_tier (str): Budget tier
             deadline (datetime): Agreed deadline
+            commit (bool): Commit now; if False the order is only flushed
+                           (it gets an ID) and the caller commits
             
         Returns:
             Order: Created order object
@@ -638,7 +674,7 @@ class OrderManager:
         )
         
         db.session.add(order)
-        db.session.commit()
+        db.session.flush()  # Assigns order.id
         
         # Add to processing queue
         self.processing_queue.append(order.id)
@@ -653,25 +689,30 @@ class OrderManager:
                 link=f'/user/orders'
             )
             db.session.add(notification)
+        
+        # Order and notification are written in one commit
+        if commit:
             db.session.commit()
         
         return order
     
-    def accept_order(self, order_id):
-        """Provider accepts order"""
+    def accept_order(self, order_id, commit=True):
+        """Provider accepts order (commit=False leaves committing to the caller)"""
         order = Order.query.get(order_id)
         if order and order.status == 'pending':
             order.update_status('in_progress')
-            db.session.commit()
+            if commit:
+                db.session.commit()
             return True
         return False
 
-    def complete_order(self, order_id):
-        """Provider marks order as complete"""
+    def complete_order(self, order_id, commit=True):
+        """Provider marks order as complete (commit=False leaves committing to the caller)"""
         order = Order.query.get(order_id)
         if order and order.status == 'in_progress':
             order.update_status('completed')
-            db.session.commit()
+            if commit:
+                db.session.commit()
             return True
         return False
         
@@ -688,13 +729,37 @@ class OrderManager:
         Returns:
             list: Order objects
         """
+        # The order lists show the service and the other party, so load
+        # them with one SELECT ... IN per relationship instead of per row
         if as_buyer:
             return Order.query.filter_by(buyer_id=user_id)\
+                             .options(selectinload(Order.service).selectinload(Service.provider))\
                              .order_by(Order.created_at.desc()).all()
         else:
             return Order.query.filter_by(seller_id=user_id)\
+                             .options(selectinload(Order.service), selectinload(Order.buyer))\
                              .order_by(Order.created_at.desc()).all()
     
+    def get_user_orders_by_role(self, user_id):
+        """
+        Get a user's orders as buyer and as seller with a single query
+        
+        Args:
+            user_id (int): User ID
+            
+        Returns:
+            tuple: (orders as buyer, orders as seller), newest first
+        """
+        orders = Order.query.filter(db.or_(Order.buyer_id == user_id, Order.seller_id == user_id))\
+                            .options(selectinload(Order.service).selectinload(Service.provider),
+                                     selectinload(Order.buyer))\
+                            .order_by(Order.created_at.desc()).all()
+        
+        # Partition in Python (an order could in principle list the user on both sides)
+        as_buyer = [order for order in orders if order.buyer_id == user_id]
+        as_seller = [order for order in orders if order.seller_id == user_id]
+        return as_buyer, as_seller
+    
     def update_order_status(self, order_id, new_status):
         """
         Update order status
@@ -730,6 +795,23 @@ class CategoryManager:
         """
         return Category.query.all()
     
+    def get_category_choices(self):
+        """
+        Get id/name pairs of all categories for form dropdowns (cached)
+        
+        Plain dicts are cached rather than Category objects, which would be
+        detached from the session on the next request.
+        
+        Returns:
+            list: Dictionaries with 'id' and 'name'
+        """
+        choices = cache.get(CATEGORY_CHOICES_KEY)
+        if choices is None:
+            rows = db.session.query(Category.id, Category.name).order_by(Category.id).all()
+            choices = [{'id': cat_id, 'name': name} for cat_id, name in rows]
+            cache.set(CATEGORY_CHOICES_KEY, choices, timeout=CATEGORY_CHOICES_TIMEOUT)
+        return choices
+    
     def create_category(self, name, description='', icon='', color=''):
         """
         Create new category (Admin function)
@@ -764,21 +846,34 @@ class CategoryManager:
         """
         Get statistics for all categories
         
+        Plain dicts are cached, so pages that only display categories can
+        use this list instead of querying Category objects.
+        
         Returns:
             list: Category stats with service counts
         """
-        categories = self.get_all_categories()
-        stats = []
-        
-        for category in categories:
-            stats.append({
-                'id': category.id,
-                'name': category.name,
-                'service_count': category.get_service_count(),
-                'icon': category.icon,
-                'color': category.color
-            })
-        
+        # Cached; stats.py drops the entry when categories or services change
+        stats = cache.get(CATEGORY_STATS_KEY)
+        if stats is not None:
+            return stats
+        
+        # Active-service counts for every category in one grouped query
+        rows = db.session.query(
+            Category.id, Category.name, Category.description, Category.icon, Category.color,
+            db.func.count(Service.id)
+        ).outerjoin(Service, (Service.category_id == Category.id) & (Service.is_active == True))\
+         .group_by(Category.id).order_by(Category.id).all()
+        
+        stats = [{
+            'id': cat_id,
+            'name': name,
+            'description': description,
+            'service_count': service_count,
+            'icon': icon,
+            'color': color
+        } for cat_id, name, description, icon, color, service_count in rows]
+        
+        cache.set(CATEGORY_STATS_KEY, stats, timeout=CATEGORY_STATS_TIMEOUT)
         return stats
 
 
@@ -789,8 +884,8 @@ class NotificationManager:
     Handles creation and retrieval of user notifications
     """
     
-    def create_notification(self, user_id, title, message, link=None):
-        """Create a new notification"""
+    def create_notification(self, user_id, title, message, link=None, commit=True):
+        """Create a new notification (commit=False leaves committing to the caller)"""
         notification = Notification(
             user_id=user_id,
             title=title,
@@ -798,7 +893,8 @@ class NotificationManager:
             link=link
         )
         db.session.add(notification)
-        db.session.commit()
+        if commit:
+            db.session.commit()
         return notification
     
     def get_unread_count(self, user_id):
@@ -821,9 +917,11 @@ class NotificationManager:
             .limit(limit).all()
 
     def mark_all_read(self, user_id):
-        """Mark all notifications as read for a user"""
-        Notification.query.filter_by(user_id=user_id, is_read=False).update({'is_read': True})
-        db.session.commit()
+        """Mark all notifications as read for a user (one UPDATE; no commit if nothing was unread)"""
+        updated = Notification.query.filter_by(user_id=user_id, is_read=False)\
+                                    .update({'is_read': True}, synchronize_session=False)
+        if updated:
+            db.session.commit()
         return True
 
     def delete_notification(self, notification_id):
@@ -847,8 +945,8 @@ class ChatManager:
     """
     Chat Management System for Orders
     """
-    def send_message(self, order_id, sender_id, content):
-        """Send a message in an order chat"""
+    def send_message(self, order_id, sender_id, content, commit=True):
+        """Send a message in an order chat (commit=False leaves committing to the caller)"""
         # Verify sender is part of order
         order = Order.query.get(order_id)
         if not order:
@@ -864,7 +962,8 @@ class ChatManager:
         )
         
         db.session.add(message)
-        db.session.commit()
+        if commit:
+            db.session.commit()
         
         return message, None
 
@@ -909,34 +1008,49 @@ class AvailabilityManager:
     def get_provider_slots(self, provider_id, start_date, end_date):
         """
         Get slots for a provider within a date range
+        
+        Only the columns the calendar needs are selected (no ORM objects).
+        
+        Returns:
+            list: (slot_id, start_time, end_time, is_booked, booking_status)
+                  tuples ordered by start time; booking_status is None when
+                  the slot has no booking
         """
-        from models import AvailabilitySlot, User, Booking
+        from models import AvailabilitySlot, Booking
         
-        # 1. Get SkillVerse Slots
-        slots = AvailabilitySlot.query.filter(
-            AvailabilitySlot.provider_id == provider_id,
-            AvailabilitySlot.start_time >= start_date,
-            AvailabilitySlot.start_time <= end_date
-        ).order_by(AvailabilitySlot.start_time).all()
+        # 1. Get SkillVerse Slots with their booking's status (outer join, one query)
+        rows = db.session.execute(
+            db.select(AvailabilitySlot.id, AvailabilitySlot.start_time, AvailabilitySlot.end_time,
+                      AvailabilitySlot.is_booked, Booking.status)
+            .outerjoin(Booking, Booking.slot_id == AvailabilitySlot.id)
+            .where(
+                AvailabilitySlot.provider_id == provider_id,
+                AvailabilitySlot.start_time >= start_date,
+                AvailabilitySlot.start_time <= end_date
+            ).order_by(AvailabilitySlot.start_time)
+        ).all()
         
         # Self-healing: Ensure is_booked flag matches actual Booking table state
         # This fixes "Ghost Availability" where slot shows green but booking fails
-        consistency_fix = False
-        for slot in slots:
-            if not slot.is_booked:
-                active_booking = Booking.query.filter_by(slot_id=slot.id).first()
-                if active_booking and active_booking.status not in ['cancelled', 'rejected']:
-                    slot.is_booked = True
-                    consistency_fix = True
-        
-        if consistency_fix:
+        ghost_ids = {
+            slot_id for slot_id, _, _, is_booked, status in rows
+            if not is_booked and status and status not in ('cancelled', 'rejected')
+        }
+        if ghost_ids:
             try:
+                db.session.execute(
+                    db.update(AvailabilitySlot)
+                    .where(AvailabilitySlot.id.in_(ghost_ids))
+                    .values(is_booked=True)
+                )
                 db.session.commit()
             except:
                 db.session.rollback()
         
-        return slots
-
+        return [
+            (slot_id, start, end, is_booked or slot_id in ghost_ids, status)
+            for slot_id, start, end, is_booked, status in rows
+        ]
 
 
     def create_slots(self, provider_id, start_time, end_time, is_recurring=False, weeks=12):
@@ -1089,8 +1203,8 @@ class AvailabilityManager:
         db.session.commit()
         return True, None
 
-    def approve_booking(self, booking_id, provider_id):
-        """Approve a booking and create an order if needed"""
+    def approve_booking(self, booking_id, provider_id, commit=True):
+        """Approve a booking and create an order if needed (commit=False leaves committing to the caller)"""
         from models import Booking, Order
         
         booking = Booking.query.get(booking_id)
@@ -1116,7 +1230,8 @@ class AvailabilityManager:
                     buyer_id=booking.client_id,
                     requirements=f"Booking for {booking.slot.start_time}",
                     scope="Consultation",
-                    budget_tier="Standard"
+                    budget_tier="Standard",
+                    commit=False
                 )
                 if order:
                      booking.order_id = order.id
@@ -1127,12 +1242,13 @@ class AvailabilityManager:
             order = Order.query.get(booking.order_id)
             if order and order.status == 'pending':
                 order.update_status('in_progress')
-            
-        db.session.commit()
+        
+        if commit:
+            db.session.commit()
         return True, None
 
-    def reject_booking(self, booking_id, provider_id):
-        """Reject a booking"""
+    def reject_booking(self, booking_id, provider_id, commit=True):
+        """Reject a booking (commit=False leaves committing to the caller)"""
         from models import Booking
         
         booking = Booking.query.get(booking_id)
@@ -1145,7 +1261,8 @@ class AvailabilityManager:
         booking.status = 'cancelled'
         booking.slot.is_booked = False
         
-        db.session.commit()
+        if commit:
+            db.session.commit()
         return True, None
 
 
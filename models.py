@@ -19,7 +19,10 @@ Author: SkillVerse Team
 Purpose: Define database schema and model behavior
 """
 
+import sqlite3
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -29,6 +32,15 @@ from werkzeug.security import generate_password_hash, check_password_hash
 db = SQLAlchemy()
 
 
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores FK constraints (and ON DELETE CASCADE) unless asked per connection"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
 class User(UserMixin, db.Model):
     """
     User Model - Represents both service providers and clients
@@ -72,7 +84,7 @@ class User(UserMixin, db.Model):
 
     
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships (One-to-Many)
@@ -326,7 +338,7 @@ class Service(db.Model):
     # Service details
     title = db.Column(db.String(200), nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
-    price = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False, index=True)
     delivery_time = db.Column(db.String(50))  # e.g., "3 days", "1 week"
     
     # Foreign Keys
@@ -334,7 +346,8 @@ class Service(db.Model):
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False, index=True)
     
     # Relationships
-    favorited_by = db.relationship('Favorite', backref='service', lazy='dynamic', cascade='all, delete-orphan')
+    favorited_by = db.relationship('Favorite', backref='service', lazy='dynamic', cascade='all, delete-orphan',
+                                   passive_deletes=True)
     
     # Media
     image_url = db.Column(db.String(255), default='default-service.jpg')
@@ -347,50 +360,56 @@ class Service(db.Model):
     
     # Statistics
     view_count = db.Column(db.Integer, default=0)
+    # Running totals, updated in the same transaction as the Favorite/Review
+    # row (toggle_favorite, ReviewSystem.add_review) so reads need no COUNT
+    favorite_count = db.Column(db.Integer, default=0)
+    review_count = db.Column(db.Integer, default=0)
+    rating_sum = db.Column(db.Integer, default=0)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
+    # Child rows are removed by the database (ON DELETE CASCADE on their FK);
+    # passive_deletes stops SQLAlchemy from loading them just to delete them
     # One service can have many reviews
     reviews = db.relationship('Review', backref='service', lazy='dynamic',
-                             cascade='all, delete-orphan')
+                             cascade='all, delete-orphan', passive_deletes=True)
     
     # One service can have many orders
-    orders = db.relationship('Order', backref='service', lazy='dynamic')
+    orders = db.relationship('Order', backref='service', lazy='dynamic', passive_deletes=True)
     
     # One service can be favorited by many users
     favorited_by = db.relationship('Favorite', backref='service', lazy='dynamic',
-                                   cascade='all, delete-orphan')
+                                   cascade='all, delete-orphan', passive_deletes=True)
+    
+    # Composite indexes: browse filtering (active services in a category) and
+    # a provider's most-viewed services (read backwards for ORDER BY view_count DESC)
+    __table_args__ = (
+        db.Index('idx_service_active_category', 'is_active', 'category_id'),
+        db.Index('idx_service_user_views', 'user_id', 'view_count'),
+    )
     
     def get_average_rating(self):
         """
         Calculate average rating for this service
         
         Algorithm:
-        1. Get all reviews for this service
-        2. Calculate sum of ratings
-        3. Divide by count
+        1. Take the running sum of ratings
+        2. Divide by the running review count
         
         Returns:
             float: Average rating (0.0 to 5.0)
         """
-        from sqlalchemy.orm import object_session
-        session = object_session(self)
+        # Precomputed by a grouped query (see set_rating_stats)
+        stats = self.__dict__.get('_rating_stats')
+        if stats is not None:
+            return stats[0]
         
-        if session:
-            reviews = self.reviews.all()
-        else:
-            # Fallback for detached instances (cached)
-            from models import Review
-            reviews = Review.query.filter_by(service_id=self.id).all()
-            
-        if not reviews:
+        if not self.review_count:
             return 0.0
-        
-        total_rating = sum(review.rating for review in reviews)
-        return round(total_rating / len(reviews), 1)
+        return round(self.rating_sum / self.review_count, 1)
     
     def get_review_count(self):
         """
@@ -399,13 +418,24 @@ class Service(db.Model):
         Returns:
             int: Review count
         """
-        from sqlalchemy.orm import object_session
-        session = object_session(self)
-        if session:
-            return self.reviews.count()
-        else:
-            from models import Review
-            return Review.query.filter_by(service_id=self.id).count()
+        stats = self.__dict__.get('_rating_stats')
+        if stats is not None:
+            return stats[1]
+        
+        return self.review_count or 0
+    
+    def set_rating_stats(self, average, count):
+        """
+        Attach rating stats computed for many services in one query
+        
+        Lets list pages skip the per-service review queries in
+        get_average_rating() and get_review_count().
+        
+        Args:
+            average (float): Average rating, or None if there are no reviews
+            count (int): Number of reviews, or None if there are no reviews
+        """
+        self._rating_stats = (round(average, 1) if average else 0.0, count or 0)
     
     def get_tags_list(self):
         """
@@ -426,7 +456,23 @@ class Service(db.Model):
         
         OOP Concept: ENCAPSULATION - Internal state modification
         """
-        self.view_count += 1
+        Service.bump_views(self.id)
+    
+    @staticmethod
+    def bump_views(service_id):
+        """
+        Atomically add one view in SQL (UPDATE ... SET view_count = view_count + 1)
+        
+        No row is loaded, and concurrent views can't overwrite each other.
+        
+        Args:
+            service_id (int): Service ID
+        """
+        db.session.execute(
+            db.update(Service)
+            .where(Service.id == service_id)
+            .values(view_count=Service.view_count + 1)
+        )
         db.session.commit()
     
     def is_favorited_by(self, user):
@@ -442,8 +488,11 @@ class Service(db.Model):
         if not user or not user.is_authenticated:
             return False
         # Fix for DetachedInstanceError: Query Favorite model directly
+        # EXISTS probe: no Favorite row is fetched or materialized
         from models import Favorite
-        return Favorite.query.filter_by(service_id=self.id, user_id=user.id).first() is not None
+        return db.session.query(
+            Favorite.query.filter_by(service_id=self.id, user_id=user.id).exists()
+        ).scalar()
     
     def get_image_url(self):
         """
@@ -494,7 +543,7 @@ class Review(db.Model):
     comment = db.Column(db.Text)
     
     # Foreign Keys
-    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False, index=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # Timestamps
@@ -542,7 +591,7 @@ class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Foreign Keys
-    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False, index=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'), nullable=False, index=True)
     buyer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     seller_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
@@ -563,6 +612,14 @@ class Order(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
     
+    # Composite indexes for the dashboard trend charts: a seller's completed
+    # orders by completion date, a buyer's orders by creation date.
+    # total_price is last so the monthly SUM is answered from the index alone.
+    __table_args__ = (
+        db.Index('idx_order_seller_completed', 'seller_id', 'status', 'completed_at', 'total_price'),
+        db.Index('idx_order_buyer_created', 'buyer_id', 'created_at', 'total_price'),
+    )
+    
     def update_status(self, new_status):
         """
         Update order status with validation
@@ -616,7 +673,7 @@ class Favorite(db.Model):
     
     # Foreign Keys
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False, index=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Timestamp
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -656,13 +713,13 @@ class Message(db.Model):
     __tablename__ = 'messages'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, index=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    order = db.relationship('Order', backref=db.backref('messages', lazy='dynamic'))
+    order = db.relationship('Order', backref=db.backref('messages', lazy='dynamic', passive_deletes=True))
     sender = db.relationship('User', backref='sent_messages')
 
 
@@ -725,8 +782,8 @@ class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     slot_id = db.Column(db.Integer, db.ForeignKey('availability_slots.id'), nullable=False, unique=True)
     client_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=True) # Optional link to specific service
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True) # Link to the paid order
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='SET NULL'), nullable=True) # Optional link to specific service
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='SET NULL'), nullable=True) # Link to the paid order
     
     status = db.Column(db.String(20), default='pending', index=True) 
     # Statuses: 'confirmed', 'completed', 'cancelled'
@@ -738,7 +795,7 @@ class Booking(db.Model):
     
     # Relationships
     client = db.relationship('User', backref='bookings_made')
-    service = db.relationship('Service', backref='bookings')
+    service = db.relationship('Service', backref=db.backref('bookings', passive_deletes=True))
 
 class Testimonial(db.Model):
     """
@@ -756,6 +813,11 @@ class Testimonial(db.Model):
 
     # Establish relationship for easier access to user info (avatar, name)
     user = db.relationship('User', backref=db.backref('testimonials', lazy=True))
+    
+    # Composite index for the home page query (active, newest first)
+    __table_args__ = (
+        db.Index('idx_testimonial_active_created', 'is_active', 'created_at'),
+    )
 
     def __repr__(self):
         return f'<Testimonial {self.id} by {self.user_id}>'
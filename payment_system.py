@@ -5,7 +5,7 @@ This module implements a Mock Payment Gateway and Wallet System
 using ONLY Python syllabus concepts for educational purposes.
 
 SYLLABUS UNITS COVERED:
-- Unit-6: File Handling (txt file read/write)
+- Unit-6: File Handling (txt file read/write, SQLite database file)
 - Unit-7: datetime module for timestamps
 - Unit-8: Exception Handling, OOP basics
 - Unit-9: Classes, Objects, Inheritance
@@ -18,6 +18,45 @@ import json                    # Unit-7: Built-in modules
 import random                  # Unit-7: Built-in modules
 from datetime import datetime  # Unit-7: datetime module
 import os                      # Unit-7: os module for file paths
+import re                      # Unit-7: Regular expressions
+import string                  # Unit-7: Template parsing (string.Formatter)
+import bisect                  # Unit-7: Binary search on sorted lists
+import csv                     # Unit-7: CSV reading/writing
+import io                      # Unit-7: In-memory text buffers
+import sqlite3                 # Unit-7: Built-in SQLite database
+import time                    # Unit-7: time module
+import shutil                  # Unit-7: File copying
+import threading               # Unit-7: Per-thread database connections
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+
+# Fast C JSON codec when available (optional dependency), stdlib json otherwise
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+    
+    _loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    def _dumps(obj):
+        # Dataclasses (e.g. Transaction) are encoded as dicts, like orjson does natively
+        return json.dumps(obj, default=asdict)
+    
+    _loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
+
+
+# Card validation patterns (compiled once at import time)
+# re.ASCII so only 0-9 count as digits
+_CARD_DIGITS_RE = re.compile(r'\d{16}', re.ASCII)
+_CVV_RE = re.compile(r'\d{3}', re.ASCII)
+_EXPIRY_RE = re.compile(r'(\d{2})/(\d{2})', re.ASCII)
+
+# Internal tag stripped from invoice descriptions
+_MANUAL_FIX_RE = re.compile(r'\s*\[MANUAL FIX\]\s*', re.IGNORECASE)
+
 
 
 # ============================================================================
@@ -65,6 +104,50 @@ class TransactionNotFoundException(CustomException):
         super().__init__(f"Transaction not found: {txn_id}")
 
 
+# ============================================================================
+# TRANSACTION RECORD (Unit-9: Classes)
+# ============================================================================
+
+@dataclass(slots=True)
+class Transaction:
+    """
+    Wallet transaction record (debit or credit).
+    
+    Uses __slots__ (slots=True): one compact object per transaction instead of
+    a dict with its own hash table. Field order matches the stored JSON.
+    """
+    id: str
+    user_id: str
+    username: str
+    amount: float
+    method: str
+    status: str
+    type: str
+    description: str
+    date: str
+    time: str
+    timestamp: str
+    new_balance: float
+    
+    def as_dict(self):
+        """Return the record as a plain dict (for callers and jsonify)."""
+        return asdict(self)
+
+
+# UPDATE/INSERT ... RETURNING needs SQLite 3.35+ (older builds re-read the row)
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Run PRAGMA optimize at most every 15 minutes per process
+OPTIMIZE_INTERVAL = 15 * 60
+_last_optimize = float('-inf')
+
+# Parameterized insert shared by single saves and the legacy bulk import
+_INSERT_TRANSACTION_SQL = (
+    'INSERT INTO transactions (id, user_id, status, date, timestamp, data) '
+    'VALUES (?, ?, ?, ?, ?, ?)'
+)
+
+
 # ============================================================================
 # PAYMENT GATEWAY CLASS (Unit-8, 9: OOP)
 # ============================================================================
@@ -79,35 +162,186 @@ class PaymentGateway:
     - INSTANCE METHODS: process_payment, save_transaction, etc.
     
     File Handling (Unit-6):
-    - Stores transactions in text file
-    - Uses JSON format for data serialization
+    - Stores transactions in a SQLite database file (WAL mode)
+    - Each row keeps the full transaction as JSON plus indexed lookup columns
+    - Rows from the legacy transactions.txt file are imported once
     """
     
-    def __init__(self, transactions_file='transactions.txt'):
+    # Bump when the schema changes (stored in PRAGMA user_version)
+    SCHEMA_VERSION = 1
+    
+    def __init__(self, db_file='payments.db', transactions_file='transactions.txt'):
         """
         Constructor (Unit-9: __init__ method)
         
         Args:
-            transactions_file: Path to transactions file (default: transactions.txt)
+            db_file: Path to SQLite database file (default: payments.db)
+            transactions_file: Legacy JSON-lines transactions file to import on first run
         """
         self.__success_rate = 1.0  # Private attribute (100% success rate - payments always succeed)
+        self.db_file = db_file
         self.transactions_file = transactions_file
-        self.__ensure_file_exists()
+        
+        # One connection per thread (per greenlet under gevent), so a single
+        # gateway can be shared app-wide while transaction() still groups
+        # only the calling request's statements
+        self.__local = threading.local()
+        
+        self.__ensure_schema()
     
-    def __ensure_file_exists(self):
+    @property
+    def conn(self):
+        """This thread's database connection, opened on first use."""
+        conn = getattr(self.__local, 'conn', None)
+        if conn is None:
+            try:
+                # Autocommit mode: each statement is its own transaction unless
+                # we open one explicitly with BEGIN
+                conn = sqlite3.connect(self.db_file, isolation_level=None, check_same_thread=False)
+                conn.execute('PRAGMA synchronous=NORMAL')
+                conn.execute('PRAGMA temp_store=MEMORY')
+            except sqlite3.Error as e:
+                raise CustomException(f"Error opening payments database: {e}")
+            self.__local.conn = conn
+            self.__maybe_optimize()
+        return conn
+    
+    @contextmanager
+    def transaction(self):
         """
-        Private method to create file if it doesn't exist.
+        Run several statements as one atomic database transaction.
+        
+        BEGIN IMMEDIATE takes the write lock up front, so a balance check and
+        the update that depends on it can't interleave with another writer.
+        Commits on success; rolls back if the block raises.
         
-        File Handling (Unit-6): Creating files
+        Nested use joins the outer transaction, so several wallet
+        operations can be grouped and committed once by the caller.
+        
+        Usage:
+            with gateway.transaction():
+                ...
+        """
+        if self.conn.in_transaction:
+            # Already inside a transaction - the outermost block commits
+            yield self.conn
+            return
+        try:
+            self.conn.execute('BEGIN IMMEDIATE')
+        except sqlite3.Error as e:
+            raise CustomException(f"Error starting transaction: {e}")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        try:
+            self.conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            self.conn.execute('ROLLBACK')
+            raise CustomException(f"Error committing transaction: {e}")
+    
+    def __maybe_optimize(self):
+        """Refresh query planner statistics at most every OPTIMIZE_INTERVAL seconds."""
+        global _last_optimize
+        now = time.monotonic()
+        if now - _last_optimize < OPTIMIZE_INTERVAL:
+            return
+        _last_optimize = now
+        try:
+            self.conn.execute('PRAGMA optimize')
+        except sqlite3.Error:
+            pass  # Only a planner hint - never fail a request over it
+    
+    def __ensure_schema(self):
         """
-        if not os.path.exists(self.transactions_file):
+        Private method to create tables and indexes if they don't exist.
+        
+        File Handling (Unit-6): Creating the database file
+        DBMS Concepts:
+        - Index on id for invoice lookups (IDs are shared by buyer and seller rows)
+        - Composite index on (user_id, timestamp) for newest-first history
+        """
+        try:
+            version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            
+            # WAL lets readers run alongside a writer; persistent per database file
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('BEGIN IMMEDIATE')
             try:
-                with open(self.transactions_file, 'w') as f:
-                    pass  # Create empty file
-            except IOError as e:
-                raise CustomException(f"Error creating transactions file: {e}")
+                self.conn.execute(
+                    'CREATE TABLE IF NOT EXISTS transactions ('
+                    ' seq INTEGER PRIMARY KEY,'
+                    ' id TEXT NOT NULL,'
+                    ' user_id TEXT NOT NULL,'
+                    ' status TEXT,'
+                    ' date TEXT,'
+                    ' timestamp TEXT,'
+                    ' data TEXT NOT NULL)'
+                )
+                self.conn.execute('CREATE INDEX IF NOT EXISTS ix_transactions_id ON transactions(id)')
+                self.conn.execute(
+                    'CREATE INDEX IF NOT EXISTS ix_transactions_user_ts '
+                    'ON transactions(user_id, timestamp DESC)'
+                )
+                # Re-check inside the write lock in case another process migrated first
+                if self.conn.execute('PRAGMA user_version').fetchone()[0] < self.SCHEMA_VERSION:
+                    self.__import_legacy_file()
+                    self.conn.execute(f'PRAGMA user_version={self.SCHEMA_VERSION}')
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            raise CustomException(f"Error creating transactions table: {e}")
     
-    def generate_transaction_id(self):
+    def __import_legacy_file(self):
+        """
+        Import rows from the legacy JSON-lines transactions file.
+        
+        File Handling (Unit-6): Reading file line by line
+        """
+        if not self.transactions_file or not os.path.exists(self.transactions_file):
+            return
+        
+        rows = []
+        try:
+            with open(self.transactions_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            rows.append(self.__row(_loads(line)))
+                        except _JSONDecodeError:
+                            continue  # Skip malformed lines
+        except IOError as e:
+            raise CustomException(f"Error reading transactions: {e}")
+        
+        # One batched statement for the whole file instead of one per line
+        self.conn.executemany(_INSERT_TRANSACTION_SQL, rows)
+    
+    @staticmethod
+    def __row(txn_data):
+        """Build the column values for one transaction row."""
+        if isinstance(txn_data, Transaction):
+            columns = (txn_data.id, txn_data.user_id, txn_data.status, txn_data.date, txn_data.timestamp)
+        else:
+            columns = (
+                str(txn_data.get('id')),
+                str(txn_data.get('user_id')),
+                txn_data.get('status'),
+                txn_data.get('date'),
+                txn_data.get('timestamp', '')
+            )
+        return columns + (_dumps(txn_data),)
+    
+    def __insert(self, txn_data):
+        """Insert one transaction row (parameterized query)."""
+        self.conn.execute(_INSERT_TRANSACTION_SQL, self.__row(txn_data))
+    
+    def generate_transaction_id(self, now=None):
         """
         Generate unique transaction ID using datetime.
         
@@ -115,10 +349,13 @@ class PaymentGateway:
         - Uses strftime to format date/time
         - Creates unique ID with timestamp
         
+        Args:
+            now: Optional datetime to reuse (defaults to datetime.now())
+        
         Returns:
             str: Transaction ID in format TXN + YYYYMMDDHHMMSS + random number
         """
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        timestamp = (now or datetime.now()).strftime('%Y%m%d%H%M%S')
         random_suffix = random.randint(100, 999)
         return f"TXN{timestamp}{random_suffix}"
     
@@ -137,37 +374,39 @@ class PaymentGateway:
         Raises:
             InvalidCardException: If card details are invalid
         """
-        # Validate card number (16 digits)
-        if not card_number or len(card_number.replace(' ', '')) != 16:
+        # Validate card number (16 digits, spaces allowed between groups)
+        digits = card_number.replace(' ', '') if card_number else ''
+        if len(digits) != 16:
             raise InvalidCardException("Card number must be 16 digits")
         
-        if not card_number.replace(' ', '').isdigit():
+        if not _CARD_DIGITS_RE.fullmatch(digits):
             raise InvalidCardException("Card number must contain only digits")
         
         # Validate CVV (3 digits)
-        if not cvv or len(cvv) != 3 or not cvv.isdigit():
+        if not cvv or not _CVV_RE.fullmatch(cvv):
             raise InvalidCardException("CVV must be 3 digits")
         
         # Validate expiry date (MM/YY format)
         if not expiry_date or len(expiry_date) != 5 or expiry_date[2] != '/':
             raise InvalidCardException("Expiry date must be in MM/YY format")
         
-        try:
-            month = int(expiry_date[:2])
-            year = int(expiry_date[3:])
-            
-            if month < 1 or month > 12:
-                raise InvalidCardException("Invalid expiry month")
-            
-            current_year = datetime.now().year % 100
-            current_month = datetime.now().month
-            
-            if year < current_year or (year == current_year and month < current_month):
-                raise InvalidCardException("Card has expired")
-                
-        except ValueError:
+        match = _EXPIRY_RE.fullmatch(expiry_date)
+        if not match:
             raise InvalidCardException("Invalid expiry date format")
         
+        month = int(match.group(1))
+        year = int(match.group(2))
+        
+        if month < 1 or month > 12:
+            raise InvalidCardException("Invalid expiry month")
+        
+        now = datetime.now()
+        current_year = now.year % 100
+        current_month = now.month
+        
+        if year < current_year or (year == current_year and month < current_month):
+            raise InvalidCardException("Card has expired")
+        
         return True
     
     def process_payment(self, amount, payment_method, user_id, description=""):
@@ -183,11 +422,20 @@ class PaymentGateway:
         Returns:
             dict: Transaction result with status, txn_id, etc.
         """
-        # Generate transaction ID
-        txn_id = self.generate_transaction_id()
+        # Read the clock once and reuse it for the ID and all timestamps
+        now = datetime.now()
         
-        # Simulate 80% success rate using random (Unit-7)
-        success = random.random() < self.__success_rate
+        # Generate transaction ID
+        txn_id = self.generate_transaction_id(now)
+        
+        # Simulate success rate using random (Unit-7)
+        # Skip the random draw when the outcome is certain (rate 1.0 or 0.0)
+        if self.__success_rate >= 1.0:
+            success = True
+        elif self.__success_rate <= 0.0:
+            success = False
+        else:
+            success = random.random() < self.__success_rate
         status = 'success' if success else 'failed'
         
         # Create transaction data
@@ -198,9 +446,9 @@ class PaymentGateway:
             'method': payment_method,
             'status': status,
             'description': description,
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'time': datetime.now().strftime('%H:%M:%S'),
-            'timestamp': datetime.now().isoformat()
+            'date': now.strftime('%Y-%m-%d'),
+            'time': now.strftime('%H:%M:%S'),
+            'timestamp': now.isoformat()
         }
         
         # Save transaction to file
@@ -210,35 +458,28 @@ class PaymentGateway:
     
     def save_transaction(self, txn_data):
         """
-        Save transaction to text file.
+        Save transaction to the database.
         
-        File Handling (Unit-6):
-        - Opens file in append mode ('a')
-        - Writes JSON data with newline
+        DBMS: Parameterized INSERT (safe from SQL injection)
         
         Args:
-            txn_data: Dictionary containing transaction details
+            txn_data: Transaction record or dictionary containing transaction details
             
         Raises:
-            CustomException: If file write fails
+            CustomException: If the write fails
         """
         try:
-            # File Handling: Opening file in append mode
-            with open(self.transactions_file, 'a', encoding='utf-8') as f:
-                # Convert dict to JSON string and write
-                f.write(json.dumps(txn_data) + '\n')
-        except IOError as e:
-            raise CustomException(f"Error saving transaction: {e}")
-        except json.JSONEncodeError as e:
+            self.__insert(txn_data)
+        except (TypeError, ValueError) as e:
             raise CustomException(f"Error encoding transaction data: {e}")
+        except sqlite3.Error as e:
+            raise CustomException(f"Error saving transaction: {e}")
     
     def get_transaction(self, txn_id, user_id=None):
         """
         Retrieve a specific transaction by ID.
         
-        File Handling (Unit-6):
-        - Opens file in read mode ('r')
-        - Reads line by line
+        DBMS: Index lookup on id - O(log N)
         
         Args:
             txn_id: Transaction ID to search for
@@ -251,80 +492,150 @@ class PaymentGateway:
             TransactionNotFoundException: If transaction not found
         """
         try:
-            with open(self.transactions_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        txn = json.loads(line)
-                        if txn.get('id') == txn_id:
-                            # If user_id is provided, ensure it matches
-                            if user_id and str(txn.get('user_id')) != str(user_id):
-                                continue
-                            return txn
+            if user_id:
+                row = self.conn.execute(
+                    'SELECT data FROM transactions WHERE id = ? AND user_id = ? ORDER BY seq LIMIT 1',
+                    (str(txn_id), str(user_id))
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    'SELECT data FROM transactions WHERE id = ? ORDER BY seq LIMIT 1',
+                    (str(txn_id),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            raise CustomException(f"Error reading transactions: {e}")
+        
+        if row is None:
             raise TransactionNotFoundException(txn_id)
-        except IOError as e:
+        return _loads(row[0])
+    
+    def __iter_rows(self, sql, params):
+        """Stream rows from a query, decoding one transaction at a time."""
+        try:
+            for (data,) in self.conn.execute(sql, params):
+                try:
+                    yield _loads(data)
+                except _JSONDecodeError:
+                    continue  # Skip malformed rows
+        except sqlite3.Error as e:
             raise CustomException(f"Error reading transactions: {e}")
-        except json.JSONDecodeError:
-            pass  # Skip malformed lines
     
-    def get_user_transactions(self, user_id):
+    def iter_user_transactions(self, user_id, limit=None, offset=0):
         """
-        Get all transactions for a specific user.
+        Stream transactions for a specific user, newest first (Generator).
         
-        File Handling (Unit-6):
-        - Reads entire file
-        - Filters by user_id
+        DBMS: Index-ordered scan on (user_id, timestamp) with LIMIT/OFFSET
         
         Args:
             user_id: User ID to filter by
+            limit: Optional maximum number of transactions
+            offset: Number of transactions to skip (for paging)
             
+        Yields:
+            dict: Transaction data
+        """
+        return self.__iter_rows(
+            'SELECT data FROM transactions WHERE user_id = ? '
+            'ORDER BY timestamp DESC, seq DESC LIMIT ? OFFSET ?',
+            (str(user_id), -1 if limit is None else limit, offset)
+        )
+    
+    def get_user_transactions_page(self, user_id, page_size, before=None):
+        """
+        Get one page of a user's transactions, newest first (keyset paging).
+
+        DBMS: Seeks the (user_id, timestamp) index past the cursor instead of
+        skipping rows with OFFSET, so every page costs the same.
+
+        Args:
+            user_id: User ID to filter by
+            page_size: Maximum number of transactions to return
+            before: Cursor from a previous page ("<timestamp>|<seq>"), or None
+
         Returns:
-            list: List of transaction dictionaries
+            tuple: (list of transaction dicts, cursor for the next page or None)
         """
-        transactions = []
+        sql = 'SELECT seq, timestamp, data FROM transactions WHERE user_id = ?'
+        params = [str(user_id)]
+        if before:
+            timestamp, _, seq = before.rpartition('|')
+            try:
+                seq = int(seq)
+            except ValueError:
+                raise CustomException(f"Invalid transaction cursor: {before}")
+            sql += ' AND (timestamp < ? OR (timestamp = ? AND seq < ?))'
+            params += [timestamp, timestamp, seq]
+        sql += ' ORDER BY timestamp DESC, seq DESC LIMIT ?'
+        params.append(page_size + 1)  # One extra row tells us if there's a next page
+
         try:
-            if os.path.exists(self.transactions_file):
-                with open(self.transactions_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                txn = json.loads(line)
-                                if str(txn.get('user_id')) == str(user_id):
-                                    transactions.append(txn)
-                            except json.JSONDecodeError:
-                                continue  # Skip malformed lines
-        except IOError as e:
+            rows = self.conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
             raise CustomException(f"Error reading transactions: {e}")
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            seq, timestamp, _ = rows[-1]
+            next_cursor = f'{timestamp}|{seq}'
+
+        transactions = []
+        for _, _, data in rows:
+            try:
+                transactions.append(_loads(data))
+            except _JSONDecodeError:
+                continue  # Skip malformed rows
+        return transactions, next_cursor
+
+    def iter_all_transactions(self, limit=None, offset=0):
+        """
+        Stream all transactions, newest first (Generator).
+        
+        Args:
+            limit: Optional maximum number of transactions
+            offset: Number of transactions to skip (for paging)
         
-        # Sort by timestamp (newest first)
-        transactions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return transactions
+        Yields:
+            dict: Transaction data
+        """
+        return self.__iter_rows(
+            'SELECT data FROM transactions ORDER BY timestamp DESC, seq DESC LIMIT ? OFFSET ?',
+            (-1 if limit is None else limit, offset)
+        )
     
-    def get_all_transactions(self):
+    def get_user_transactions(self, user_id, limit=None, offset=0):
         """
-        Get all transactions from file.
+        Get transactions for a specific user, newest first.
         
+        Args:
+            user_id: User ID to filter by
+            limit: Optional maximum number of transactions to return
+            offset: Number of transactions to skip (for paging)
+            
         Returns:
-            list: List of all transaction dictionaries
+            list: List of transaction dictionaries
         """
-        transactions = []
-        try:
-            if os.path.exists(self.transactions_file):
-                with open(self.transactions_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                txn = json.loads(line)
-                                transactions.append(txn)
-                            except json.JSONDecodeError:
-                                continue
-        except IOError as e:
-            raise CustomException(f"Error reading transactions: {e}")
+        return list(self.iter_user_transactions(user_id, limit, offset))
+    
+    def get_all_transactions(self, limit=None, offset=0):
+        """
+        Get all transactions, newest first.
+        
+        Args:
+            limit: Optional maximum number of transactions to return
+            offset: Number of transactions to skip (for paging)
         
-        transactions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return transactions
+        Returns:
+            list: List of all transaction dictionaries
+        """
+        return list(self.iter_all_transactions(limit, offset))
+    
+    def close(self):
+        """Close this thread's database connection (reopened on next use)."""
+        conn = getattr(self.__local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.__local.conn = None
 
 
 # ============================================================================
@@ -341,8 +652,9 @@ class WalletManager:
     - METHODS: get_balance, add_money, deduct_money
     
     File Handling (Unit-6):
-    - Stores wallet data in text file
-    - Each line represents a user's wallet
+    - Stores wallets in the payments SQLite database (one row per user)
+    - Balance changes are single keyed UPDATE statements - O(log N)
+    - Rows from the legacy wallets.txt file are imported once
     """
     
     def __init__(self, wallet_file='wallets.txt', payment_gateway=None):
@@ -350,32 +662,58 @@ class WalletManager:
         Initialize WalletManager.
         
         Args:
-            wallet_file: Path to wallet data file
+            wallet_file: Legacy JSON-lines wallet file to import on first run
             payment_gateway: PaymentGateway instance for transactions
         """
         self.wallet_file = wallet_file
         # COMPOSITION: WalletManager HAS-A PaymentGateway
         self.payment_gateway = payment_gateway or PaymentGateway()
-        self.__ensure_file_exists()
+        self.__ensure_schema()
+    
+    @property
+    def conn(self):
+        """Wallets share the gateway's (per-thread) database connection."""
+        return self.payment_gateway.conn
     
-    def __ensure_file_exists(self):
-        """Create wallet file if it doesn't exist."""
-        if not os.path.exists(self.wallet_file):
+    def __ensure_schema(self):
+        """Create the wallets table (and import wallets.txt) if it doesn't exist."""
+        try:
+            if self.__table_exists():
+                return
+            
+            self.conn.execute('BEGIN IMMEDIATE')
             try:
-                with open(self.wallet_file, 'w', encoding='utf-8') as f:
-                    pass
-            except IOError as e:
-                raise CustomException(f"Error creating wallet file: {e}")
+                # Re-check inside the write lock in case another process created it first
+                if not self.__table_exists():
+                    self.conn.execute(
+                        'CREATE TABLE wallets ('
+                        ' user_id TEXT PRIMARY KEY,'
+                        ' balance REAL NOT NULL DEFAULT 0,'
+                        ' created_at TEXT,'
+                        ' last_updated TEXT)'
+                    )
+                    self.__import_legacy_file()
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            raise CustomException(f"Error creating wallets table: {e}")
+    
+    def __table_exists(self):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'wallets'"
+        ).fetchone() is not None
     
-    def __read_all_wallets(self):
+    def __import_legacy_file(self):
         """
-        Read all wallet data from file.
-        
-        File Handling (Unit-6): Reading entire file
+        Import wallets from the legacy JSON-lines file (last line per user wins).
         
-        Returns:
-            dict: Dictionary mapping user_id to wallet data
+        File Handling (Unit-6): Reading file line by line
         """
+        if not self.wallet_file or not os.path.exists(self.wallet_file):
+            return
+        
         wallets = {}
         try:
             with open(self.wallet_file, 'r', encoding='utf-8') as f:
@@ -383,29 +721,56 @@ class WalletManager:
                     line = line.strip()
                     if line:
                         try:
-                            wallet = json.loads(line)
-                            user_id = str(wallet.get('user_id'))
-                            wallets[user_id] = wallet
-                        except json.JSONDecodeError:
+                            wallet = _loads(line)
+                            wallets[str(wallet.get('user_id'))] = wallet
+                        except _JSONDecodeError:
                             continue
         except IOError as e:
             raise CustomException(f"Error reading wallets: {e}")
-        return wallets
+        
+        self.conn.executemany(
+            'INSERT INTO wallets (user_id, balance, created_at, last_updated) VALUES (?, ?, ?, ?)',
+            [
+                (user_id, float(w.get('balance', 0)), w.get('created_at'), w.get('last_updated'))
+                for user_id, w in wallets.items()
+            ]
+        )
     
-    def __write_all_wallets(self, wallets):
+    def __fetch_wallet(self, user_id):
+        """Return the wallet row for user_id as a dict, or None."""
+        try:
+            row = self.conn.execute(
+                'SELECT user_id, balance, created_at, last_updated FROM wallets WHERE user_id = ?',
+                (user_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            raise CustomException(f"Error reading wallets: {e}")
+        if row is None:
+            return None
+        return {'user_id': row[0], 'balance': row[1], 'created_at': row[2], 'last_updated': row[3]}
+    
+    def __credit(self, user_id, amount, now):
         """
-        Write all wallet data to file.
+        Add amount to a wallet, creating it if needed, in one atomic statement.
         
-        File Handling (Unit-6): Writing to file (overwrite mode)
+        DBMS: UPSERT (INSERT ... ON CONFLICT DO UPDATE)
         
-        Args:
-            wallets: Dictionary of all wallet data
+        Returns:
+            float: New balance
         """
+        sql = (
+            'INSERT INTO wallets (user_id, balance, created_at, last_updated) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(user_id) DO UPDATE SET '
+            'balance = balance + excluded.balance, last_updated = excluded.last_updated'
+        )
+        params = (user_id, float(amount), now, now)
         try:
-            with open(self.wallet_file, 'w', encoding='utf-8') as f:
-                for wallet in wallets.values():
-                    f.write(json.dumps(wallet) + '\n')
-        except IOError as e:
+            if _HAS_RETURNING:
+                # New balance comes back from the same statement
+                return float(self.conn.execute(sql + ' RETURNING balance', params).fetchone()[0])
+            self.conn.execute(sql, params)
+            return self.get_balance(user_id)
+        except sqlite3.Error as e:
             raise CustomException(f"Error writing wallets: {e}")
     
     def get_balance(self, user_id):
@@ -418,12 +783,13 @@ class WalletManager:
         Returns:
             float: Current balance (0 if wallet doesn't exist)
         """
-        wallets = self.__read_all_wallets()
-        user_id = str(user_id)
-        
-        if user_id in wallets:
-            return float(wallets[user_id].get('balance', 0))
-        return 0.0
+        try:
+            row = self.conn.execute(
+                'SELECT balance FROM wallets WHERE user_id = ?', (str(user_id),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            raise CustomException(f"Error reading wallets: {e}")
+        return float(row[0]) if row else 0.0
     
     def get_wallet(self, user_id):
         """
@@ -435,18 +801,18 @@ class WalletManager:
         Returns:
             dict: Wallet data including balance and history
         """
-        wallets = self.__read_all_wallets()
         user_id = str(user_id)
-        
-        if user_id in wallets:
-            return wallets[user_id]
+        wallet = self.__fetch_wallet(user_id)
+        if wallet:
+            return wallet
         
         # Return default wallet structure if not exists
+        now = datetime.now().isoformat()
         return {
             'user_id': user_id,
             'balance': 0.0,
-            'created_at': datetime.now().isoformat(),
-            'last_updated': datetime.now().isoformat()
+            'created_at': now,
+            'last_updated': now
         }
     
     def create_wallet(self, user_id, initial_balance=0):
@@ -460,19 +826,18 @@ class WalletManager:
         Returns:
             dict: Created wallet data
         """
-        wallets = self.__read_all_wallets()
         user_id = str(user_id)
-        
-        if user_id not in wallets:
-            wallets[user_id] = {
-                'user_id': user_id,
-                'balance': float(initial_balance),
-                'created_at': datetime.now().isoformat(),
-                'last_updated': datetime.now().isoformat()
-            }
-            self.__write_all_wallets(wallets)
-        
-        return wallets[user_id]
+        now = datetime.now().isoformat()
+        try:
+            # No-op if the wallet already exists
+            self.conn.execute(
+                'INSERT OR IGNORE INTO wallets (user_id, balance, created_at, last_updated) '
+                'VALUES (?, ?, ?, ?)',
+                (user_id, float(initial_balance), now, now)
+            )
+        except sqlite3.Error as e:
+            raise CustomException(f"Error writing wallets: {e}")
+        return self.__fetch_wallet(user_id)
     
     def add_money(self, user_id, amount, payment_method='card', description='Wallet Recharge'):
         """
@@ -498,32 +863,20 @@ class WalletManager:
         if amount <= 0:
             raise CustomException("Amount must be greater than 0")
         
-        # Process payment through gateway
-        txn_result = self.payment_gateway.process_payment(
-            amount=amount,
-            payment_method=payment_method,
-            user_id=user_id,
-            description=description
-        )
-        
-        # Only add to wallet if payment succeeded
-        if txn_result['status'] == 'success':
-            wallets = self.__read_all_wallets()
-            user_id = str(user_id)
+        # Transaction record and balance change commit together (or not at all)
+        with self.payment_gateway.transaction():
+            # Process payment through gateway
+            txn_result = self.payment_gateway.process_payment(
+                amount=amount,
+                payment_method=payment_method,
+                user_id=user_id,
+                description=description
+            )
             
-            if user_id not in wallets:
-                wallets[user_id] = {
-                    'user_id': user_id,
-                    'balance': 0.0,
-                    'created_at': datetime.now().isoformat()
-                }
-            
-            # Update balance
-            wallets[user_id]['balance'] = float(wallets[user_id].get('balance', 0)) + float(amount)
-            wallets[user_id]['last_updated'] = datetime.now().isoformat()
-            
-            self.__write_all_wallets(wallets)
-            txn_result['new_balance'] = wallets[user_id]['balance']
+            # Only add to wallet if payment succeeded
+            if txn_result['status'] == 'success':
+                # Reuse the payment's timestamp instead of reading the clock again
+                txn_result['new_balance'] = self.__credit(str(user_id), amount, txn_result['timestamp'])
         
         return txn_result
     
@@ -547,42 +900,53 @@ class WalletManager:
         if amount <= 0:
             raise CustomException("Amount must be greater than 0")
         
-        wallets = self.__read_all_wallets()
         user_id = str(user_id)
+        # Read the clock once and reuse the formatted values
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
+        with self.payment_gateway.transaction():
+            # Check and deduct in one statement - the guard (balance >= amount)
+            # makes a concurrent double-spend impossible
+            sql = (
+                'UPDATE wallets SET balance = balance - ?, last_updated = ? '
+                'WHERE user_id = ? AND balance >= ?'
+            )
+            params = (float(amount), now_iso, user_id, float(amount))
+            try:
+                if _HAS_RETURNING:
+                    # New balance comes back from the same statement (no row = not enough money)
+                    row = self.conn.execute(sql + ' RETURNING balance', params).fetchone()
+                    new_balance = float(row[0]) if row else None
+                else:
+                    cur = self.conn.execute(sql, params)
+                    new_balance = self.get_balance(user_id) if cur.rowcount else None
+            except sqlite3.Error as e:
+                raise CustomException(f"Error writing wallets: {e}")
+            
+            # Check sufficient balance
+            if new_balance is None:
+                raise InsufficientBalanceException(required=amount, available=self.get_balance(user_id))
+            
+            # Record transaction
+            txn = Transaction(
+                id=self.payment_gateway.generate_transaction_id(now),
+                user_id=user_id,
+                username=username or f'User #{user_id}',
+                amount=float(amount),
+                method='wallet',
+                status='success',
+                type='debit',
+                description=description,
+                date=now.strftime('%Y-%m-%d'),
+                time=now.strftime('%H:%M:%S'),
+                timestamp=now_iso,
+                new_balance=new_balance
+            )
+            
+            self.payment_gateway.save_transaction(txn)
         
-        current_balance = 0
-        if user_id in wallets:
-            current_balance = float(wallets[user_id].get('balance', 0))
-        
-        # Check sufficient balance
-        if current_balance < amount:
-            raise InsufficientBalanceException(required=amount, available=current_balance)
-        
-        # Deduct amount
-        wallets[user_id]['balance'] = current_balance - float(amount)
-        wallets[user_id]['last_updated'] = datetime.now().isoformat()
-        
-        self.__write_all_wallets(wallets)
-        
-        # Record transaction
-        txn_result = {
-            'id': self.payment_gateway.generate_transaction_id(),
-            'user_id': user_id,
-            'username': username or f'User #{user_id}',
-            'amount': float(amount),
-            'method': 'wallet',
-            'status': 'success',
-            'type': 'debit',
-            'description': description,
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'time': datetime.now().strftime('%H:%M:%S'),
-            'timestamp': datetime.now().isoformat(),
-            'new_balance': wallets[user_id]['balance']
-        }
-        
-        self.payment_gateway.save_transaction(txn_result)
-        
-        return txn_result
+        return txn.as_dict()
     
     def credit_seller(self, user_id, amount, description='Payment Received', username=None, transaction_id=None):
         """
@@ -601,42 +965,34 @@ class WalletManager:
         if amount <= 0:
             raise CustomException("Amount must be greater than 0")
         
-        wallets = self.__read_all_wallets()
         user_id = str(user_id)
+        # Read the clock once and reuse the formatted values
+        now = datetime.now()
+        now_iso = now.isoformat()
         
-        # Create wallet if doesn't exist
-        if user_id not in wallets:
-            wallets[user_id] = {
-                'user_id': user_id,
-                'balance': 0.0,
-                'created_at': datetime.now().isoformat()
-            }
-        
-        # Add amount to seller's wallet
-        wallets[user_id]['balance'] = float(wallets[user_id].get('balance', 0)) + float(amount)
-        wallets[user_id]['last_updated'] = datetime.now().isoformat()
-        
-        self.__write_all_wallets(wallets)
-        
-        # Record transaction as credit for seller
-        txn_result = {
-            'id': transaction_id or self.payment_gateway.generate_transaction_id(),
-            'user_id': user_id,
-            'username': username or f'User #{user_id}',
-            'amount': float(amount),
-            'method': 'wallet',
-            'status': 'success',
-            'type': 'credit',
-            'description': description,
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'time': datetime.now().strftime('%H:%M:%S'),
-            'timestamp': datetime.now().isoformat(),
-            'new_balance': wallets[user_id]['balance']
-        }
-        
-        self.payment_gateway.save_transaction(txn_result)
+        with self.payment_gateway.transaction():
+            # Add amount to seller's wallet (created if it doesn't exist)
+            new_balance = self.__credit(user_id, amount, now_iso)
+            
+            # Record transaction as credit for seller
+            txn = Transaction(
+                id=transaction_id or self.payment_gateway.generate_transaction_id(now),
+                user_id=user_id,
+                username=username or f'User #{user_id}',
+                amount=float(amount),
+                method='wallet',
+                status='success',
+                type='credit',
+                description=description,
+                date=now.strftime('%Y-%m-%d'),
+                time=now.strftime('%H:%M:%S'),
+                timestamp=now_iso,
+                new_balance=new_balance
+            )
+            
+            self.payment_gateway.save_transaction(txn)
         
-        return txn_result
+        return txn.as_dict()
     
     def get_transaction_history(self, user_id):
         """
@@ -655,205 +1011,19 @@ class WalletManager:
 # INVOICE GENERATOR CLASS (Unit-9: OOP)
 # ============================================================================
 
-class InvoiceGenerator:
-    """
-    Generate HTML invoices for transactions.
-    
-    OOP Concept: Single Responsibility Principle
-    - This class only handles invoice generation
-    - Uses template strings for HTML generation
-    
-    File Handling (Unit-6):
-    - Creates HTML files for invoices
-    """
-    
-    def __init__(self, invoices_folder='invoices'):
-        """
-        Initialize InvoiceGenerator.
-        
-        Args:
-            invoices_folder: Folder to store generated invoices
-        """
-        self.invoices_folder = invoices_folder
-        self.__ensure_folder_exists()
-    
-    def __ensure_folder_exists(self):
-        """Create invoices folder if it doesn't exist."""
-        if not os.path.exists(self.invoices_folder):
-            try:
-                os.makedirs(self.invoices_folder)
-            except OSError as e:
-                raise CustomException(f"Error creating invoices folder: {e}")
-    
-    def generate_invoice_html(self, transaction):
-        """
-        Generate HTML invoice content for a transaction.
-        
-        String Formatting (Unit-3):
-        - Uses f-strings for template
-        - Creates formatted HTML document
-        
-        Args:
-            transaction: Transaction dictionary
-            
-        Returns:
-            str: HTML content of invoice
-        """
-        # Transaction details
-        txn_id = transaction.get('id', 'N/A')
-        amount = transaction.get('amount', 0)
-        status = transaction.get('status', 'N/A')
-        method = transaction.get('method', 'N/A')
-        date = transaction.get('date', 'N/A')
-        time = transaction.get('time', 'N/A')
-        description = transaction.get('description', 'Service Transaction')
-        user_id = transaction.get('user_id', 'N/A')
-        username = transaction.get('username', f'User #{user_id}')
-        
-        # Clean up description - remove specific internal tags like [MANUAL FIX]
-        import re
-        description = re.sub(r'\s*\[MANUAL FIX\]\s*', '', description, flags=re.IGNORECASE).strip()
-        
-        # Status color
-        status_color = '#28a745' if status == 'success' else '#dc3545'
-        
-        # Generate HTML using f-string (Unit-3)
-        html_content = f"""<!DOCTYPE html>
+# Shared invoice stylesheet - linked from each invoice instead of inlined
+INVOICE_CSS_NAME = 'invoice.css'
+_INVOICE_CSS_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'css', INVOICE_CSS_NAME)
+
+# Invoice HTML template - built once at import, filled per invoice with
+# str.format_map
+_INVOICE_TEMPLATE = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Invoice - {txn_id}</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 40px 20px;
-        }}
-        .invoice-container {{
-            max-width: 800px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 25px 50px -12px rgba(0, 0, 0, 0.25);
-            overflow: hidden;
-        }}
-        .invoice-header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 40px;
-            text-align: center;
-        }}
-        .invoice-header h1 {{
-            font-size: 2.5rem;
-            margin-bottom: 10px;
-        }}
-        .invoice-header p {{
-            opacity: 0.9;
-            font-size: 1.1rem;
-        }}
-        .invoice-body {{
-            padding: 40px;
-        }}
-        .invoice-info {{
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 30px;
-            padding-bottom: 20px;
-            border-bottom: 2px dashed #e0e0e0;
-        }}
-        .info-block h3 {{
-            color: #667eea;
-            margin-bottom: 10px;
-            font-size: 0.9rem;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }}
-        .info-block p {{
-            font-size: 1rem;
-            color: #333;
-        }}
-        .transaction-details {{
-            background: #f8f9fa;
-            border-radius: 15px;
-            padding: 30px;
-            margin-bottom: 30px;
-        }}
-        .detail-row {{
-            display: flex;
-            justify-content: space-between;
-            padding: 15px 0;
-            border-bottom: 1px solid #e0e0e0;
-        }}
-        .detail-row:last-child {{
-            border-bottom: none;
-        }}
-        .detail-label {{
-            color: #666;
-            font-weight: 500;
-        }}
-        .detail-value {{
-            color: #333;
-            font-weight: 600;
-        }}
-        .amount-section {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 30px;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 30px;
-        }}
-        .amount-section h2 {{
-            font-size: 1rem;
-            opacity: 0.9;
-            margin-bottom: 10px;
-            text-transform: uppercase;
-            letter-spacing: 2px;
-        }}
-        .amount-section .amount {{
-            font-size: 3rem;
-            font-weight: 700;
-        }}
-        .status-badge {{
-            display: inline-block;
-            padding: 8px 20px;
-            border-radius: 25px;
-            font-size: 0.9rem;
-            font-weight: 600;
-            text-transform: uppercase;
-            background: {status_color};
-            color: white;
-        }}
-        .invoice-footer {{
-            text-align: center;
-            padding: 30px;
-            background: #f8f9fa;
-            color: #666;
-        }}
-        .invoice-footer p {{
-            margin-bottom: 10px;
-        }}
-        .brand {{
-            color: #667eea;
-            font-weight: 700;
-        }}
-        @media print {{
-            body {{
-                background: white;
-                padding: 0;
-            }}
-            .invoice-container {{
-                box-shadow: none;
-            }}
-        }}
-    </style>
+    <link rel="stylesheet" href="{css_href}">
 </head>
 <body>
     <div class="invoice-container">
@@ -874,7 +1044,7 @@ class InvoiceGenerator:
                 </div>
                 <div class="info-block">
                     <h3>Status</h3>
-                    <p><span class="status-badge">{status.upper()}</span></p>
+                    <p><span class="status-badge" style="background: {status_color};">{status_upper}</span></p>
                 </div>
             </div>
             
@@ -890,7 +1060,7 @@ class InvoiceGenerator:
                 </div>
                 <div class="detail-row">
                     <span class="detail-label">Payment Method</span>
-                    <span class="detail-value">{method.upper()}</span>
+                    <span class="detail-value">{method_upper}</span>
                 </div>
                 <div class="detail-row">
                     <span class="detail-label">Customer</span>
@@ -910,13 +1080,167 @@ class InvoiceGenerator:
         <div class="invoice-footer">
             <p>Thank you for using <span class="brand">SkillVerse</span>!</p>
             <p>This is a computer-generated invoice. No signature required.</p>
-            <p>Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+            <p>Generated on: {generated_on}</p>
         </div>
     </div>
 </body>
 </html>"""
+
+# Template pre-split into (literal bytes, field name, format spec) segments
+# for streaming invoices to disk (see InvoiceGenerator.iter_invoice_chunks)
+_INVOICE_SEGMENTS = [
+    (literal.encode('utf-8'), field, spec)
+    for literal, field, spec, _ in string.Formatter().parse(_INVOICE_TEMPLATE)
+]
+
+
+class InvoiceGenerator:
+    """
+    Generate HTML invoices for transactions.
+    
+    OOP Concept: Single Responsibility Principle
+    - This class only handles invoice generation
+    - Uses a template string (built once at import) for HTML generation
+    
+    File Handling (Unit-6):
+    - Creates HTML files for invoices
+    """
+    
+    def __init__(self, invoices_folder='invoices'):
+        """
+        Initialize InvoiceGenerator.
         
-        return html_content
+        Args:
+            invoices_folder: Folder to store generated invoices
+        """
+        self.invoices_folder = invoices_folder
+        self.__ensure_folder_exists()
+        self.__ensure_css_exists()
+    
+    def __ensure_folder_exists(self):
+        """Create invoices folder if it doesn't exist."""
+        if not os.path.exists(self.invoices_folder):
+            try:
+                os.makedirs(self.invoices_folder)
+            except OSError as e:
+                raise CustomException(f"Error creating invoices folder: {e}")
+    
+    def __ensure_css_exists(self):
+        """Copy the shared invoice stylesheet next to saved invoices once."""
+        css_path = os.path.join(self.invoices_folder, INVOICE_CSS_NAME)
+        if not os.path.exists(css_path):
+            try:
+                shutil.copyfile(_INVOICE_CSS_SOURCE, css_path)
+            except OSError as e:
+                raise CustomException(f"Error writing invoice stylesheet: {e}")
+    
+    def __invoice_values(self, transaction, css_href=INVOICE_CSS_NAME):
+        """
+        Collect the variable fields of an invoice.
+        
+        Args:
+            transaction: Transaction dictionary
+            css_href: URL of the invoice stylesheet
+            
+        Returns:
+            dict: Template field name -> value
+        """
+        # Transaction details
+        txn_id = transaction.get('id', 'N/A')
+        amount = transaction.get('amount', 0)
+        status = transaction.get('status', 'N/A')
+        method = transaction.get('method', 'N/A')
+        date = transaction.get('date', 'N/A')
+        time = transaction.get('time', 'N/A')
+        description = transaction.get('description', 'Service Transaction')
+        user_id = transaction.get('user_id', 'N/A')
+        username = transaction.get('username', f'User #{user_id}')
+        
+        # Clean up description - remove specific internal tags like [MANUAL FIX]
+        description = _MANUAL_FIX_RE.sub('', description).strip()
+        
+        # Status color
+        status_color = '#28a745' if status == 'success' else '#dc3545'
+        
+        return {
+            'txn_id': txn_id,
+            'amount': amount,
+            'status_upper': status.upper(),
+            'status_color': status_color,
+            'method_upper': method.upper(),
+            'date': date,
+            'time': time,
+            'description': description,
+            'username': username,
+            'generated_on': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'css_href': css_href
+        }
+    
+    def generate_invoice_html(self, transaction, css_href=INVOICE_CSS_NAME):
+        """
+        Generate HTML invoice content for a transaction.
+        
+        String Formatting (Unit-3):
+        - Fills the module-level template with str.format_map
+        - Creates formatted HTML document
+        
+        Args:
+            transaction: Transaction dictionary
+            css_href: URL of the invoice stylesheet (relative for saved files)
+            
+        Returns:
+            str: HTML content of invoice
+        """
+        # Fill the precompiled template (Unit-3: str.format_map)
+        return _INVOICE_TEMPLATE.format_map(self.__invoice_values(transaction, css_href))
+    
+    def iter_invoice_chunks(self, transaction):
+        """
+        Generate invoice HTML as a stream of UTF-8 byte chunks (Generator).
+        
+        The constant parts of the template are pre-encoded; only the
+        variable fields are formatted and encoded per invoice. Lets callers
+        write straight to a file without building the whole document first.
+        
+        Args:
+            transaction: Transaction dictionary
+            
+        Yields:
+            bytes: Pieces of the invoice document, in order
+        """
+        values = self.__invoice_values(transaction)
+        for literal, field, spec in _INVOICE_SEGMENTS:
+            if literal:
+                yield literal
+            if field is not None:
+                yield format(values[field], spec).encode('utf-8')
+    
+    def write_invoice(self, transaction, fileobj):
+        """
+        Write an invoice to an open binary file object.
+        
+        Args:
+            transaction: Transaction dictionary
+            fileobj: File opened in binary write mode
+        """
+        fileobj.writelines(self.iter_invoice_chunks(transaction))
+    
+    def __invoice_path(self, transaction):
+        """Return the file path for a transaction's invoice."""
+        txn_id = transaction.get('id', 'unknown')
+        return os.path.join(self.invoices_folder, f"invoice_{txn_id}.html")
+    
+    def __write_invoice(self, transaction):
+        """
+        Stream one invoice file to disk as UTF-8 bytes.
+        
+        Returns:
+            str: Path to saved invoice file
+        """
+        file_path = self.__invoice_path(transaction)
+        with open(file_path, 'wb') as f:
+            self.write_invoice(transaction, f)
+        return file_path
     
     def save_invoice(self, transaction):
         """
@@ -931,17 +1255,34 @@ class InvoiceGenerator:
         Returns:
             str: Path to saved invoice file
         """
-        txn_id = transaction.get('id', 'unknown')
-        html_content = self.generate_invoice_html(transaction)
+        try:
+            return self.__write_invoice(transaction)
+        except IOError as e:
+            raise CustomException(f"Error saving invoice: {e}")
+    
+    def save_invoices_batch(self, transactions):
+        """
+        Save invoices for many transactions (e.g. month-end reports).
         
-        file_path = os.path.join(self.invoices_folder, f"invoice_{txn_id}.html")
+        File Handling (Unit-6):
+        - Each file is streamed from pre-encoded template chunks
+        - Data is flushed to disk once for the whole batch, not per file
         
+        Args:
+            transactions: List of transaction dictionaries
+            
+        Returns:
+            list: Paths to saved invoice files
+        """
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            return file_path
+            paths = [self.__write_invoice(txn) for txn in transactions]
         except IOError as e:
             raise CustomException(f"Error saving invoice: {e}")
+        
+        # One flush for the batch (os.sync is not available on Windows)
+        if paths and hasattr(os, 'sync'):
+            os.sync()
+        return paths
 
 
 # ============================================================================
@@ -954,27 +1295,72 @@ class TransactionFilter:
     
     OOP Concept: Utility/Helper class
     - Contains static-like methods for transaction operations
+    - No shared state: a date index is owned by the caller that built it
     """
     
+    # Column headers of the CSV export
+    CSV_HEADERS = ['Transaction ID', 'Amount', 'Status', 'Method', 'Description', 'Date', 'Time']
+    
+    @staticmethod
+    def _csv_row(txn):
+        """Fields of one transaction in CSV column order"""
+        return (
+            txn.get('id', ''),
+            txn.get('amount', ''),
+            txn.get('status', ''),
+            txn.get('method', ''),
+            txn.get('description', ''),
+            txn.get('date', ''),
+            txn.get('time', '')
+        )
+    
+    @staticmethod
+    def date_index(transactions):
+        """
+        Build a date-sorted index of a transaction list.
+        
+        Keep it next to the list and pass it to filter_by_date_range() to
+        slice the same list many times; build a new one after the list
+        changes.
+        
+        Args:
+            transactions: List of transaction dictionaries
+            
+        Returns:
+            tuple: (dates, positions) - dates ascending (for bisect);
+                   positions[i] is the index in the list of dates[i]
+        """
+        order = sorted(range(len(transactions)), key=lambda i: transactions[i].get('date', ''))
+        dates = [transactions[i].get('date', '') for i in order]
+        return dates, order
+    
     @staticmethod
-    def filter_by_date_range(transactions, start_date, end_date):
+    def filter_by_date_range(transactions, start_date, end_date, index=None):
         """
         Filter transactions by date range.
         
+        Searching: without an index this is one linear scan (O(N)); with
+        an index from date_index() the window bounds are found by binary
+        search (bisect) - O(log N + k) per repeated query.
+        
         Args:
             transactions: List of transaction dictionaries
             start_date: Start date string (YYYY-MM-DD)
             end_date: End date string (YYYY-MM-DD)
+            index: Optional date_index(transactions) result
             
         Returns:
-            list: Filtered transactions
+            list: Filtered transactions (in their original order)
         """
-        filtered = []
-        for txn in transactions:
-            txn_date = txn.get('date', '')
-            if start_date <= txn_date <= end_date:
-                filtered.append(txn)
-        return filtered
+        if index is None:
+            return [txn for txn in transactions if start_date <= txn.get('date', '') <= end_date]
+        if start_date > end_date:
+            return []
+        dates, order = index
+        lo = bisect.bisect_left(dates, start_date)
+        hi = bisect.bisect_right(dates, end_date)
+        # Restore the caller's order (e.g. newest first)
+        return [transactions[i] for i in sorted(order[lo:hi])]
     
     @staticmethod
     def filter_by_status(transactions, status):
@@ -1008,31 +1394,56 @@ class TransactionFilter:
         if not transactions:
             return "No transactions to export"
         
-        # CSV Header
-        headers = ['Transaction ID', 'Amount', 'Status', 'Method', 'Description', 'Date', 'Time']
-        csv_content = ','.join(headers) + '\n'
+        # csv.writer quotes fields containing commas/quotes/newlines (RFC 4180)
+        # and writes into one in-memory buffer instead of concatenating strings
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(TransactionFilter.CSV_HEADERS)
         
         # CSV Rows
-        for txn in transactions:
-            row = [
-                str(txn.get('id', '')),
-                str(txn.get('amount', '')),
-                str(txn.get('status', '')),
-                str(txn.get('method', '')),
-                str(txn.get('description', '')).replace(',', ';'),  # Escape commas
-                str(txn.get('date', '')),
-                str(txn.get('time', ''))
-            ]
-            csv_content += ','.join(row) + '\n'
+        writer.writerows(TransactionFilter._csv_row(txn) for txn in transactions)
+        csv_content = buffer.getvalue()
         
         # Save to file
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
+            with open(filename, 'w', encoding='utf-8', newline='') as f:
                 f.write(csv_content)
         except IOError as e:
             raise CustomException(f"Error exporting CSV: {e}")
         
         return csv_content
+    
+    @staticmethod
+    def iter_csv(transactions, batch_size=500):
+        """
+        Stream transactions as CSV text (Generator).
+        
+        Memory stays bounded by one batch of rows, so a download can start
+        before the last transaction has been read.
+        
+        Args:
+            transactions: Iterable of transaction dictionaries (e.g. a generator)
+            batch_size: Rows written per yielded chunk
+            
+        Yields:
+            str: CSV text chunks
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(TransactionFilter.CSV_HEADERS)
+        
+        count = 0
+        for count, txn in enumerate(transactions, 1):
+            writer.writerow(TransactionFilter._csv_row(txn))
+            if count % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        if count == 0:
+            yield "No transactions to export"
+        else:
+            yield buffer.getvalue()
 
 
 # ============================================================================
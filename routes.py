@@ -16,29 +16,164 @@ Author: SkillVerse Team
 Purpose: Handle HTTP requests and responses
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session, abort, make_response
 from datetime import datetime, timezone, timedelta
+from zoneinfo import ZoneInfo
 from flask_login import login_user, logout_user, login_required, current_user
 from functools import wraps
 from models import db, User, Service, Category, Review, Order, Favorite, Notification, Message, ProjectShowcase, AvailabilitySlot, Booking, Testimonial, ContactMessage
 from managers import (service_manager, user_manager, search_engine, 
                      review_system, order_manager, category_manager, notification_manager, chat_manager, availability_manager)
+from stats import get_site_stats, get_rating_bundle, get_delivery_times
+from extensions import cache, limiter
 from werkzeug.utils import secure_filename
 import os
-from flask import current_app
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from flask import current_app, g
 import io
-import base64
-from sqlalchemy import func
-import numpy as np
-import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import joinedload, load_only, contains_eager
+from sqlalchemy.exc import IntegrityError
 import textwrap
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 
-def save_uploaded_file(file_storage, folder='images'):
+# Dashboard trend charts show monthly totals over this many months
+DASHBOARD_TREND_MONTHS = 12
+
+
+def dashboard_trend_start():
+    """
+    First instant (naive UTC) of the dashboard trend window
+    
+    Midnight on the 1st of the month DASHBOARD_TREND_MONTHS - 1 months
+    before the current one, so the trend covers exactly
+    DASHBOARD_TREND_MONTHS calendar months including this one.
+    
+    Returns:
+        datetime: Window start
+    """
+    now = datetime.now(timezone.utc)
+    months = now.year * 12 + now.month - 1 - (DASHBOARD_TREND_MONTHS - 1)
+    return datetime(months // 12, months % 12 + 1, 1)
+
+
+def month_bucket(column):
+    """
+    SQL expression grouping a datetime column by calendar month ('YYYY-MM')
+    
+    Args:
+        column: SQLAlchemy datetime column
+        
+    Returns:
+        SQL expression labelled 'bucket'
+    """
+    if db.engine.dialect.name == 'sqlite':
+        return func.strftime('%Y-%m', column).label('bucket')
+    return func.to_char(column, 'YYYY-MM').label('bucket')
+
+
+def _native_thread_pool(max_workers, name):
+    """
+    Create an executor whose workers are real OS threads
+    
+    Under gevent's monkey-patching a plain ThreadPoolExecutor runs its
+    tasks as greenlets on the event loop; gevent's own executor keeps
+    them on native threads, so CPU-heavy work there doesn't stall every
+    other request in the worker.
+    
+    Args:
+        max_workers (int): Number of threads
+        name (str): Thread name prefix (standard executor only)
+        
+    Returns:
+        Executor: concurrent.futures-compatible executor
+    """
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+            return NativeThreadPoolExecutor(max_workers=max_workers)
+    except ImportError:
+        pass
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+# Background writers for uploaded files, so the request doesn't wait on disk
+# I/O or on the Pillow resize (native threads, see _native_thread_pool)
+_UPLOAD_POOL = _native_thread_pool(4, 'upload')
+
+
+# Service images larger than this are scaled down (aspect ratio kept)
+SERVICE_IMAGE_MAX_SIZE = (1200, 1200)
+
+
+def _shrink_image(path, max_size):
+    """
+    Scale a JPEG/PNG/WebP image down to fit max_size, in place
+    
+    Args:
+        path (str): Image file path
+        max_size (tuple): (width, height) bounding box
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return  # Pillow not installed - keep the original
+    
+    with Image.open(path) as img:
+        fmt = img.format
+        if fmt not in ('JPEG', 'PNG', 'WEBP'):
+            return  # Leave GIFs (animation) and unknown formats alone
+        if img.width <= max_size[0] and img.height <= max_size[1]:
+            return
+        # Apply the camera's EXIF rotation before dropping the metadata
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(max_size)
+        img.save(path, format=fmt, optimize=True, **({'quality': 85} if fmt == 'JPEG' else {}))
+
+
+def _write_upload(stream, path, max_size=None):
+    """
+    Copy an upload stream to disk and close it (runs on _UPLOAD_POOL)
+    
+    The file is written under a temporary name and renamed into place, so
+    a page that links to it never serves a half-written or unresized image.
+    
+    Args:
+        stream: File-like object detached from the request
+        path (str): Destination file path
+        max_size (tuple): Optional (width, height) to scale images down to
+    """
+    tmp_path = path + '.part'
+    try:
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(stream, f, 64 * 1024)
+    finally:
+        stream.close()
+    
+    if max_size:
+        try:
+            _shrink_image(tmp_path, max_size)
+        except Exception:
+            pass  # Not a readable image - store it as uploaded
+    os.replace(tmp_path, path)
+
+
+def save_uploaded_file(file_storage, folder='images', wait=False, max_size=None):
     """
     Save uploaded file to static folder
+    
+    The name is chosen now and returned immediately; the disk write runs
+    on a background upload worker.
+    
+    Args:
+        file_storage: Werkzeug FileStorage from request.files
+        folder (str): Sub-folder of static/ to save into
+        wait (bool): Block until the file is written (when it must exist now)
+        max_size (tuple): Optional (width, height) to scale images down to
+        
+    Returns:
+        str: Saved filename or None
     """
     if not file_storage:
         return None
@@ -48,16 +183,32 @@ def save_uploaded_file(file_storage, folder='images'):
         return None
         
     # Generate unique filename to prevent overwrites
-    import uuid
+    # 4 random bytes give the same 8 hex chars without building a whole UUID
     name, ext = os.path.splitext(filename)
-    unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
+    unique_filename = f"{name}_{os.urandom(4).hex()}{ext}"
     
     # Ensure directory exists
     upload_path = os.path.join(current_app.root_path, 'static', folder)
     os.makedirs(upload_path, exist_ok=True)
     
-    # Save file
-    file_storage.save(os.path.join(upload_path, unique_filename))
+    # Take the stream away from the request so closing the request doesn't close it
+    stream = file_storage.stream
+    stream.seek(0)
+    file_storage.stream = io.BytesIO()
+    
+    full_path = os.path.join(upload_path, unique_filename)
+    future = _UPLOAD_POOL.submit(_write_upload, stream, full_path, max_size)
+    if wait:
+        future.result()
+        return unique_filename
+    
+    logger = current_app.logger
+    
+    def log_failure(done):
+        if done.exception():
+            logger.error(f"Failed to save upload {full_path}: {done.exception()}")
+    
+    future.add_done_callback(log_failure)
     return unique_filename
 
 # Create blueprints
@@ -74,6 +225,43 @@ availability_bp = Blueprint('availability', __name__)
 # DECORATORS
 # ============================================================================
 
+def _cached_user_role():
+    """
+    Resolve the current user's role once per request
+    
+    Returns:
+        str: 'anon' for anonymous visitors, otherwise the user's user_type
+    """
+    if 'user_role' not in g:
+        g.user_role = current_user.user_type if current_user.is_authenticated else 'anon'
+    return g.user_role
+
+
+def get_service_or_404(service_id, *columns):
+    """
+    Load a service or abort with 404
+    
+    Without columns this goes through the session identity map
+    (db.session.get), so a service already loaded in this request costs
+    no query. With columns only those are fetched (load_only); any other
+    attribute is loaded on first access.
+    
+    Args:
+        service_id (int): Service ID
+        *columns: Optional Service columns to load
+        
+    Returns:
+        Service: Service object
+    """
+    if columns:
+        service = Service.query.options(load_only(*columns)).filter_by(id=service_id).first()
+    else:
+        service = db.session.get(Service, service_id)
+    if service is None:
+        abort(404)
+    return service
+
+
 def admin_required(f):
     """
     Decorator to require admin privileges
@@ -90,7 +278,7 @@ def admin_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or not current_user.is_admin():
+        if _cached_user_role() != 'admin':
             flash('You need admin privileges to access this page.', 'danger')
             return redirect(url_for('main.index'))
         return f(*args, **kwargs)
@@ -109,20 +297,58 @@ def provider_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated:
+        role = _cached_user_role()
+        if role == 'anon':
             flash('Please log in to access this page.', 'info')
             return redirect(url_for('auth.login'))
-        if current_user.user_type not in ['provider', 'admin']:
+        if role not in ('provider', 'admin'):
             flash('You need a provider account to access this page.', 'warning')
             return redirect(url_for('main.index'))
         return f(*args, **kwargs)
     return decorated_function
 
 
+# Browser cache lifetime (seconds) of the public read-only JSON endpoints
+PUBLIC_API_MAX_AGE = 60
+
+
+def public_json(f):
+    """
+    Decorator for read-only JSON views that are the same for every visitor
+    
+    Successful responses get an ETag of their body and a short public
+    max-age; a poll with a matching If-None-Match is answered with an
+    empty 304 instead of the payload.
+    
+    Args:
+        f: Function to wrap
+        
+    Returns:
+        Wrapped function
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        response = make_response(f(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        response.headers['Cache-Control'] = f'public, max-age={PUBLIC_API_MAX_AGE}'
+        # gzip and plain bodies must not be served to each other from a cache
+        response.vary.add('Accept-Encoding')
+        response.add_etag()
+        return response.make_conditional(request)
+    return decorated_function
+
+
 # ============================================================================
 # MAIN ROUTES
 # ============================================================================
 
+# Home page testimonials: the "All Reviews" modal lists up to TESTIMONIALS_LIMIT,
+# the carousel shows the first TESTIMONIALS_CAROUSEL of them
+TESTIMONIALS_LIMIT = 30
+TESTIMONIALS_CAROUSEL = 12
+
+
 @main_bp.route('/')
 def index():
     """
@@ -142,25 +368,33 @@ def index():
     # Get featured services using ServiceManager
     featured_services = service_manager.get_featured_services(limit=4)
     
-    # Get all categories
-    categories = category_manager.get_all_categories()
-    
     # Get category stats
     category_stats = category_manager.get_category_stats()
     
-    # Get stats for home page
-    stats_data = {
-        'total_users': User.query.count(),
-        'total_services': Service.query.filter_by(is_active=True).count(),
-        'total_reviews': Review.query.count()
-    }
+    # Get stats for home page (cached, see stats.py)
+    stats_data = get_site_stats()
+    
+    # Newest testimonials only, with just the author fields the cards show
+    testimonials = Testimonial.query.options(
+        joinedload(Testimonial.user).load_only(User.username, User.full_name, User.avatar_url)
+    ).filter_by(is_active=True).order_by(Testimonial.created_at.desc()).limit(TESTIMONIALS_LIMIT).all()
     
-    return render_template('index.html',
+    html = render_template('index.html',
                          featured_services=featured_services,
-                         categories=categories,
                          category_stats=category_stats,
                          stats_data=stats_data,
-                         testimonials=Testimonial.query.filter_by(is_active=True).order_by(Testimonial.created_at.desc()).all())
+                         testimonials=testimonials,
+                         carousel_testimonials=testimonials[:TESTIMONIALS_CAROUSEL])
+    
+    if _personalized_request():
+        return html
+    
+    # Anonymous visitors all get the same page: let browsers and the
+    # reverse proxy (see nginx.conf) keep it, and answer revalidation with 304
+    response = make_response(html)
+    response.headers['Cache-Control'] = f'public, max-age={HOME_PAGE_MAX_AGE}, s-maxage={HOME_PAGE_SHARED_MAX_AGE}'
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @main_bp.route('/testimonials/add', methods=['POST'])
@@ -190,15 +424,30 @@ def add_testimonial():
 
 
 
+# HTTP cache lifetimes (seconds) for the anonymous landing page
+HOME_PAGE_MAX_AGE = 60
+HOME_PAGE_SHARED_MAX_AGE = 300
+
+
+def _personalized_request():
+    """
+    Whether this response must not come from the shared page cache
+    
+    The header shows the logged-in user and base.html renders pending
+    flash messages, so only anonymous requests with no flashes are cached.
+    
+    Returns:
+        bool: True to bypass the cache
+    """
+    return current_user.is_authenticated or '_flashes' in session
+
+
 @main_bp.route('/about')
+@cache.cached(timeout=300, key_prefix='about_page', unless=_personalized_request)
 def about():
     """About page"""
-    # Get stats for about page
-    stats_data = {
-        'total_users': User.query.count(),
-        'total_services': Service.query.filter_by(is_active=True).count(),
-        'total_reviews': Review.query.count()
-    }
+    # Get stats for about page (cached, see stats.py)
+    stats_data = get_site_stats()
     return render_template('about.html', stats_data=stats_data)
 
 
@@ -236,12 +485,14 @@ def contact():
 
 
 @main_bp.route('/terms')
+@cache.cached(timeout=86400, unless=_personalized_request)
 def terms():
     """Terms of Service page"""
     return render_template('legal/terms.html')
 
 
 @main_bp.route('/privacy')
+@cache.cached(timeout=86400, unless=_personalized_request)
 def privacy():
     """Privacy Policy page"""
     return render_template('legal/privacy.html')
@@ -252,6 +503,7 @@ def privacy():
 # ============================================================================
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit(lambda: current_app.config['AUTH_RATE_LIMIT'], methods=['POST'])
 def login():
     """
     User login route
@@ -299,6 +551,7 @@ def login():
 
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@limiter.limit(lambda: current_app.config['AUTH_RATE_LIMIT'], methods=['POST'])
 def register():
     """
     User registration route
@@ -343,9 +596,8 @@ def register():
             flash(error, 'danger')
             return render_template('auth/register.html')
     
-    from managers import CategoryManager
-    category_manager = CategoryManager()
-    categories = category_manager.get_all_categories()
+    # Cached id/name list; invalidated on category changes (see stats.py)
+    categories = category_manager.get_category_choices()
     return render_template('auth/register.html', categories=categories)
 
 
@@ -380,8 +632,10 @@ def google_callback():
         # (parse_id_token requires server metadata which triggers SSL bug on Render)
         user_info = oauth.google.userinfo()
         
-        # Check if user exists
-        user = User.query.filter_by(email=user_info['email']).first()
+        # Check if user exists (unique email index; only the columns login needs)
+        user = User.query.filter_by(email=user_info['email']).options(
+            load_only(User.id, User.username, User.full_name, User.is_active, User.user_type)
+        ).first()
         
         if user and not user.is_active:
             flash('YOU ARE DEACTIVATED BY ADMIN', 'danger')
@@ -390,10 +644,13 @@ def google_callback():
         if not user:
             # Create new user
             username = user_info['email'].split('@')[0]
-            # Ensure unique username
+            # Ensure unique username: fetch every taken name with this prefix in
+            # one indexed query, then pick the first free suffix in Python (Set lookup)
             base_username = username
+            taken = {name for (name,) in db.session.query(User.username)
+                     .filter(User.username.startswith(base_username, autoescape=True))}
             counter = 1
-            while User.query.filter_by(username=username).first():
+            while username in taken:
                 username = f"{base_username}{counter}"
                 counter += 1
                 
@@ -416,9 +673,6 @@ def google_callback():
             
             flash('Account created successfully via Google!', 'success')
         
-        # Refresh user from database to ensure proper session
-        db.session.refresh(user)
-        
         # Log in user
         login_user(user, remember=True)
         flash(f'Welcome back, {user.full_name or user.username}!', 'success')
@@ -515,6 +769,7 @@ def browse():
     min_price = request.args.get('min_price', type=float)
     max_price = request.args.get('max_price', type=float)
     sort_by = request.args.get('sort', 'rating')
+    page = request.args.get('page', 1, type=int)
     
     # Build filters dictionary
     filters = {}
@@ -525,28 +780,48 @@ def browse():
     if max_price:
         filters['max_price'] = max_price
     
-    # Search services
-    if query or filters:
-        services = service_manager.search_services(query, filters)
-    else:
-        # Get all services
-        services = Service.query.filter_by(is_active=True).all()
-    
-    # Sort services
+    # Per-service rating stats in one grouped subquery
+    # (Service.reviews is a dynamic relationship, so it can't be eager-loaded)
+    rating_sq = db.session.query(
+        Review.service_id,
+        func.avg(Review.rating).label('avg_rating'),
+        func.count(Review.id).label('review_count')
+    ).group_by(Review.service_id).subquery()
+    
+    # Filter, sort and load category/provider in SQL instead of per service
+    services_query = service_manager.build_search_query(query, filters) \
+        .outerjoin(rating_sq, rating_sq.c.service_id == Service.id) \
+        .options(joinedload(Service.category), joinedload(Service.provider)) \
+        .add_columns(rating_sq.c.avg_rating, rating_sq.c.review_count)
+    
+    # Sort services (Service.id last, so tied rows keep one order across pages)
     if sort_by == 'price_asc':
-        services.sort(key=lambda s: s.price)
+        services_query = services_query.order_by(Service.price.asc(), Service.id.desc())
     elif sort_by == 'price_desc':
-        services.sort(key=lambda s: s.price, reverse=True)
+        services_query = services_query.order_by(Service.price.desc(), Service.id.desc())
     elif sort_by == 'rating':
-        services.sort(key=lambda s: s.get_average_rating(), reverse=True)
-    elif sort_by == 'newest':
-        services.sort(key=lambda s: s.created_at, reverse=True)
+        services_query = services_query.order_by(func.coalesce(rating_sq.c.avg_rating, 0).desc(), Service.id.desc())
+    else:
+        services_query = services_query.order_by(Service.created_at.desc(), Service.id.desc())
+    
+    # Only one page of rows leaves the database
+    pagination = services_query.paginate(page=page, per_page=current_app.config['SERVICES_PER_PAGE'],
+                                         error_out=False)
+    services = []
+    for service, avg_rating, review_count in pagination.items:
+        service.set_rating_stats(avg_rating, review_count)
+        services.append(service)
+    
+    # Current filters, reused by the page links
+    page_args = {key: value for key, value in request.args.items() if key != 'page'}
     
-    # Get categories for filter
-    categories = category_manager.get_all_categories()
+    # Get categories for filter (cached dicts with id/name/icon)
+    categories = category_manager.get_category_stats()
     
     return render_template('services.html',
                          services=services,
+                         pagination=pagination,
+                         page_args=page_args,
                          categories=categories,
                          query=query,
                          selected_category=category_id,
@@ -564,52 +839,61 @@ def detail(service_id):
     Returns:
         Rendered template with service details
     """
-    service = Service.query.get_or_404(service_id)
+    # Increment view count (single atomic UPDATE, before the row is loaded)
+    Service.bump_views(service_id)
     
-    # Increment view count
-    service.increment_views()
+    # Category and provider come back in the same query
+    query = Service.query.options(
+        joinedload(Service.category), joinedload(Service.provider)
+    ).filter_by(id=service_id)
     
-    # Get reviews
-    reviews = review_system.get_service_reviews(service_id, limit=10)
-    
-    # Get rating distribution
-    rating_dist = review_system.calculate_rating_distribution(service_id)
-    
-    # Get related services (same category)
-    related_services = Service.query.filter(
-        Service.category_id == service.category_id,
-        Service.id != service_id,
-        Service.is_active == True
-    ).limit(4).all()
-    
-    # Check if user has favorited this service
     is_favorited = False
     existing_order = None
     wallet_balance = 0  # Default wallet balance
     
     if current_user.is_authenticated:
-        is_favorited = service.is_favorited_by(current_user)
+        # Favorite flag and the viewer's ACTIVE order (pending or in_progress,
+        # decides whether Chat replaces Order Now) ride along as correlated
+        # subqueries, so the service row and both answers are one round-trip
+        user_id = current_user.id
+        favorited = select(Favorite.id).where(
+            Favorite.service_id == Service.id, Favorite.user_id == user_id
+        ).exists()
+        
+        def active_order(column):
+            return select(column).where(
+                Order.service_id == Service.id,
+                Order.buyer_id == user_id,
+                Service.user_id != user_id,
+                Order.status.in_(['pending', 'in_progress'])
+            ).order_by(Order.created_at.desc()).limit(1).scalar_subquery()
+        
+        row = query.add_columns(favorited, active_order(Order.id), active_order(Order.status)).first()
+        if row is None:
+            abort(404)
+        service, is_favorited, order_id, order_status = row
+        if order_id is not None:
+            # The template only reads id and status
+            existing_order = {'id': order_id, 'status': order_status}
         
         # Get wallet balance for order validation (Unit-9: OOP, Composition)
-        from payment_system import WalletManager
-        wallet_mgr = WalletManager()
-        wallet_balance = wallet_mgr.get_balance(current_user.id)
-        
-        # Check if user has an ACTIVE order for this service (pending or in_progress)
-        # This determines if Chat button should be shown instead of Order Now
-        if current_user.id != service.user_id:
-            existing_order = Order.query.filter_by(
-                service_id=service_id,
-                buyer_id=current_user.id
-            ).filter(
-                Order.status.in_(['pending', 'in_progress'])
-            ).order_by(Order.created_at.desc()).first()
+        # Wallets live in payments.db, so this cannot join the query above
+        wallet_balance = current_app.wallet_manager.get_balance(user_id)
+    else:
+        service = query.first_or_404()
+    
+    # Get reviews
+    reviews = review_system.get_service_reviews(service_id, limit=10)
+    
+    # Rating distribution, average and count (cached, dropped on review writes)
+    ratings = get_rating_bundle(service_id)
+    rating_dist = ratings['distribution']
+    service.set_rating_stats(ratings['average'], ratings['count'])
     
     return render_template('service_detail.html',
                          service=service,
                          reviews=reviews,
                          rating_dist=rating_dist,
-                         related_services=related_services,
                          is_favorited=is_favorited,
                          existing_order=existing_order,
                          wallet_balance=wallet_balance)
@@ -651,12 +935,12 @@ def create():
         # Handle Image Upload (Mandatory)
         if 'image' not in request.files or request.files['image'].filename == '':
             flash('Please upload a service image to continue.', 'danger')
-            categories = category_manager.get_all_categories()
+            categories = category_manager.get_category_choices()
             return render_template('service_create.html', categories=categories)
             
         file = request.files['image']
         if file and file.filename != '':
-            filename = save_uploaded_file(file)
+            filename = save_uploaded_file(file, max_size=SERVICE_IMAGE_MAX_SIZE)
             if filename:
                 data['image_url'] = filename
         
@@ -670,7 +954,7 @@ def create():
             flash('Error creating service. Please try again.', 'danger')
     
     # Get categories for form
-    categories = category_manager.get_all_categories()
+    categories = category_manager.get_category_choices()
     
     return render_template('service_create.html', categories=categories)
 
@@ -687,7 +971,7 @@ def edit(service_id):
     Returns:
         Rendered template or redirect
     """
-    service = Service.query.get_or_404(service_id)
+    service = get_service_or_404(service_id)
     
     # Check ownership
     if service.user_id != current_user.id and not current_user.is_admin():
@@ -707,7 +991,7 @@ def edit(service_id):
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                filename = save_uploaded_file(file)
+                filename = save_uploaded_file(file, max_size=SERVICE_IMAGE_MAX_SIZE)
                 if filename:
                     service.image_url = filename
         
@@ -715,10 +999,32 @@ def edit(service_id):
         flash('Service updated successfully!', 'success')
         return redirect(url_for('service.detail', service_id=service_id))
     
-    categories = category_manager.get_all_categories()
+    categories = category_manager.get_category_choices()
     return render_template('service_edit.html', service=service, categories=categories)
 
 
+def _delete_service_children(service_id):
+    """
+    Remove or detach the rows that reference a service, in bulk
+    
+    SQLite can't alter constraints, so databases created before the
+    models declared ON DELETE rules still have plain foreign keys (see
+    init_db.upgrade_foreign_keys); with PRAGMA foreign_keys=ON they would
+    reject deleting the service. Doing the cascade by hand works with
+    either kind of table.
+    
+    Args:
+        service_id (int): Service ID
+    """
+    order_ids = select(Order.id).where(Order.service_id == service_id)
+    
+    db.session.execute(db.delete(Message).where(Message.order_id.in_(order_ids)))
+    db.session.execute(update(Booking).where(Booking.order_id.in_(order_ids)).values(order_id=None))
+    db.session.execute(update(Booking).where(Booking.service_id == service_id).values(service_id=None))
+    for model in (Order, Review, Favorite):
+        db.session.execute(db.delete(model).where(model.service_id == service_id))
+
+
 @service_bp.route('/<int:service_id>/delete', methods=['POST'])
 @login_required
 def delete(service_id):
@@ -734,7 +1040,7 @@ def delete(service_id):
     Returns:
         Redirect
     """
-    service = Service.query.get_or_404(service_id)
+    service = get_service_or_404(service_id, Service.id, Service.user_id, Service.title, Service.is_active)
     
     # Check ownership
     if service.user_id != current_user.id and not current_user.is_admin():
@@ -746,20 +1052,10 @@ def delete(service_id):
         service_title = service.title
         
         try:
-            # Delete related orders and their messages first
-            orders = Order.query.filter_by(service_id=service_id).all()
-            for order in orders:
-                # Delete messages associated with this order
-                Message.query.filter_by(order_id=order.id).delete()
-                db.session.delete(order)
-            
-            # Delete related reviews
-            Review.query.filter_by(service_id=service_id).delete()
-            
-            # Delete related favorites
-            Favorite.query.filter_by(service_id=service_id).delete()
-            
-            # Now delete the service
+            # On PostgreSQL one DELETE is enough: orders (and their messages),
+            # reviews and favorites go with it through ON DELETE CASCADE
+            if db.engine.dialect.name != 'postgresql':
+                _delete_service_children(service_id)
             db.session.delete(service)
             db.session.commit()
             
@@ -789,8 +1085,8 @@ def add_review(service_id):
     Returns:
         Redirect
     """
-    # Get the service to check ownership
-    service = Service.query.get_or_404(service_id)
+    # Get the service to check ownership (only the owner column is needed)
+    service = get_service_or_404(service_id, Service.id, Service.user_id)
     
     # VALIDATION: Prevent service owner from reviewing their own service
     if service.user_id == current_user.id:
@@ -823,25 +1119,32 @@ def toggle_favorite(service_id):
     Returns:
         JSON response
     """
-    service = Service.query.get_or_404(service_id)
+    # Existence check only; the service row itself isn't needed
+    if not db.session.query(Service.query.filter_by(id=service_id).exists()).scalar():
+        abort(404)
     
-    # Check if already favorited
-    favorite = Favorite.query.filter_by(
+    # Try removing first: one DELETE tells us whether it was favorited
+    removed = Favorite.query.filter_by(
         user_id=current_user.id,
         service_id=service_id
-    ).first()
+    ).delete(synchronize_session=False)
+    
+    # favorite_count moves in the same transaction as the Favorite row
+    bump_favorites = update(Service).where(Service.id == service_id)
     
-    if favorite:
-        # Remove from favorites
-        db.session.delete(favorite)
+    if removed:
+        db.session.execute(bump_favorites.values(favorite_count=Service.favorite_count - 1))
         db.session.commit()
         return jsonify({'status': 'removed', 'message': 'Removed from favorites'})
-    else:
-        # Add to favorites
-        favorite = Favorite(user_id=current_user.id, service_id=service_id)
-        db.session.add(favorite)
+    
+    # Add to favorites (unique_user_service_favorite guards double clicks)
+    try:
+        db.session.add(Favorite(user_id=current_user.id, service_id=service_id))
+        db.session.execute(bump_favorites.values(favorite_count=Service.favorite_count + 1))
         db.session.commit()
-        return jsonify({'status': 'added', 'message': 'Added to favorites'})
+    except IntegrityError:
+        db.session.rollback()
+    return jsonify({'status': 'added', 'message': 'Added to favorites'})
 
 
 @service_bp.route('/<int:service_id>/order', methods=['POST'])
@@ -861,10 +1164,10 @@ def place_order(service_id):
         Redirect
     """
     # Import payment system for wallet validation
-    from payment_system import WalletManager, PaymentGateway, InsufficientBalanceException
+    from payment_system import InsufficientBalanceException
     
-    # Get service to check price
-    service = Service.query.get_or_404(service_id)
+    # Get service to check price (just the columns pricing and payment use)
+    service = get_service_or_404(service_id, Service.id, Service.price, Service.user_id, Service.title, Service.is_active)
     
     requirements = request.form.get('requirements', '')
     budget_tier = request.form.get('budget_tier', 'Standard')
@@ -881,8 +1184,8 @@ def place_order(service_id):
     # =====================================================================
     # WALLET BALANCE VALIDATION (Unit-8: Exception Handling, Unit-9: OOP)
     # =====================================================================
-    gateway = PaymentGateway()
-    wallet_mgr = WalletManager(payment_gateway=gateway)
+    gateway = current_app.payment_gateway
+    wallet_mgr = current_app.wallet_manager
     
     # Get current wallet balance
     current_balance = wallet_mgr.get_balance(current_user.id)
@@ -894,18 +1197,31 @@ def place_order(service_id):
         flash(f'Insufficient wallet balance! You need ₹{int(order_price)} but have only ₹{int(current_balance)}. Please add ₹{int(shortfall)} to your wallet.', 'danger')
         return redirect(url_for('user.wallet'))
     
-    # Create order using OrderManager
-    order = order_manager.create_order(service_id, current_user.id, requirements, '', budget_tier, None)
+    # Create order using OrderManager - flushed only (it has an ID) so the
+    # order, its notifications and the payment succeed or fail together
+    order = order_manager.create_order(service_id, current_user.id, requirements, '', budget_tier, None,
+                                       commit=False)
     
-    if order:
-        # =====================================================================
-        # DEDUCT AMOUNT FROM WALLET (Unit-6: File Handling, Unit-9: OOP)
-        # =====================================================================
-        buyer_payment_success = False
-        seller_credit_success = False
-        buyer_txn_id = None
-        
-        try:
+    if not order:
+        flash('Error placing order. Please try again.', 'danger')
+        return redirect(url_for('service.detail', service_id=service_id))
+    
+    # Platform fee: 10% (SkillVerse keeps 10%, seller gets 90%)
+    platform_fee_percent = 0.10
+    seller_amount = order.total_price * (1 - platform_fee_percent)
+    
+    # Get seller username for transaction record
+    seller = order.seller
+    seller_username = seller.username if seller else f'User #{order.seller_id}'
+    
+    # =====================================================================
+    # PAY FOR THE ORDER (Unit-8: Exception Handling, Unit-9: OOP)
+    # Buyer debit and seller credit commit as ONE wallet transaction:
+    # the guarded UPDATE (balance >= amount) rejects a double-spend, and
+    # if either step fails neither wallet changes
+    # =====================================================================
+    try:
+        with gateway.transaction():
             # Capture transaction result to get ID
             buyer_txn = wallet_mgr.deduct_money(
                 user_id=current_user.id,
@@ -914,36 +1230,7 @@ def place_order(service_id):
                 username=current_user.username
             )
             buyer_txn_id = buyer_txn.get('id')
-            buyer_payment_success = True
-            print(f"[DEBUG] Successfully deducted ₹{order.total_price} from buyer (user_id: {current_user.id}). Txn ID: {buyer_txn_id}")
             
-        except InsufficientBalanceException:
-            # This shouldn't happen as we checked above, but just in case
-            flash('Payment failed due to insufficient balance.', 'danger')
-            # Cancel the order
-            order.status = 'cancelled'
-            db.session.commit()
-            return redirect(url_for('service.detail', service_id=service_id))
-        except Exception as e:
-            print(f"[ERROR] Buyer deduction failed: {str(e)}")
-            flash(f'Payment processing error: {str(e)}', 'danger')
-            order.status = 'cancelled'
-            db.session.commit()
-            return redirect(url_for('service.detail', service_id=service_id))
-        
-        # =====================================================================
-        # CREDIT AMOUNT TO SELLER'S WALLET (Unit-6: File Handling, Unit-9: OOP)
-        # =====================================================================
-        # Platform fee: 10% (SkillVerse keeps 10%, seller gets 90%)
-        platform_fee_percent = 0.10
-        seller_amount = order.total_price * (1 - platform_fee_percent)
-        
-        # Get seller username for transaction record
-        seller = User.query.get(order.seller_id)
-        seller_username = seller.username if seller else f'User #{order.seller_id}'
-        
-        try:
-            print(f"[DEBUG] Attempting to credit seller (user_id: {order.seller_id}) with ₹{seller_amount}")
             wallet_mgr.credit_seller(
                 user_id=order.seller_id,
                 amount=seller_amount,
@@ -951,31 +1238,71 @@ def place_order(service_id):
                 username=seller_username,
                 transaction_id=buyer_txn_id
             )
-            seller_credit_success = True
-            print(f"[DEBUG] Successfully credited ₹{seller_amount} to seller (user_id: {order.seller_id})")
-        except Exception as e:
-            # Log the error but don't cancel the order - the buyer already paid
-            # Admin will need to manually credit the seller
-            print(f"[ERROR] Failed to credit seller: {str(e)}")
-            # Note: In production, you'd want to queue this for retry or alert admin
-        
-        # Create notification for the provider
-        notification_manager.create_notification(
-            user_id=order.seller_id,
-            title=f'New Order #{order.id} Received',
-            message=f'You have a new order #{order.id} for "{order.service.title}" from {current_user.username}. Price: ₹{int(order.total_price)}',
-            link=url_for('user.order_detail', order_id=order.id)
+    except InsufficientBalanceException:
+        # Balance changed since the check above (e.g. a concurrent order)
+        db.session.rollback()
+        flash('Payment failed due to insufficient balance.', 'danger')
+        return redirect(url_for('user.wallet'))
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Order payment failed: {str(e)}")
+        flash(f'Payment processing error: {str(e)}', 'danger')
+        return redirect(url_for('service.detail', service_id=service_id))
+    
+    # Create notification for the provider
+    notification_manager.create_notification(
+        user_id=order.seller_id,
+        title=f'New Order #{order.id} Received',
+        message=f'You have a new order #{order.id} for "{order.service.title}" from {current_user.username}. Price: ₹{int(order.total_price)}',
+        link=url_for('user.order_detail', order_id=order.id),
+        commit=False
+    )
+    
+    # Single commit for the order and both notifications
+    # (plain values kept for the refund: rollback detaches the new order)
+    order_id, seller_id, total_price = order.id, order.seller_id, order.total_price
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception(
+            'Saving order #%s failed after payment: buyer %s paid %.2f (txn %s), seller %s credited %.2f',
+            order_id, current_user.id, total_price, buyer_txn_id, seller_id, seller_amount
         )
-        
-        # Send emails to both customer and provider
-        from email_utils import send_order_placed_emails
-        send_order_placed_emails(order)
-        
-        flash(f'Order placed successfully! ₹{int(order.total_price)} deducted from your wallet.', 'success')
-        return redirect(url_for('user.order_detail', order_id=order.id))
-    else:
-        flash('Error placing order. Please try again.', 'danger')
+        # Compensate: reverse the wallet transfer so nobody pays for a lost order
+        try:
+            with gateway.transaction():
+                wallet_mgr.deduct_money(
+                    user_id=seller_id,
+                    amount=seller_amount,
+                    description=f'Reversal: {service.title} (order not saved)',
+                    username=seller_username
+                )
+                wallet_mgr.credit_seller(
+                    user_id=current_user.id,
+                    amount=total_price,
+                    description=f'Refund: {service.title} (order not saved)',
+                    username=current_user.username
+                )
+        except Exception:
+            # Buyer is still charged: leave a full record for a manual refund
+            current_app.logger.exception(
+                'Refund failed for unsaved order #%s: buyer %s paid %.2f (txn %s), '
+                'seller %s was credited %.2f',
+                order_id, current_user.id, total_price, buyer_txn_id, seller_id, seller_amount
+            )
+            flash('Error placing order, and the automatic refund of your payment failed. '
+                  'Please contact support with reference #' + str(order_id) + '.', 'danger')
+            return redirect(url_for('service.detail', service_id=service_id))
+        flash('Error placing order. Your wallet has been refunded.', 'danger')
         return redirect(url_for('service.detail', service_id=service_id))
+    
+    # Send emails to both customer and provider
+    from email_utils import send_order_placed_emails
+    send_order_placed_emails(order)
+    
+    flash(f'Order placed successfully! ₹{int(order.total_price)} deducted from your wallet.', 'success')
+    return redirect(url_for('user.order_detail', order_id=order.id))
 
 
 # ============================================================================
@@ -1011,141 +1338,118 @@ def dashboard():
         today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).replace(tzinfo=None)
         today_end = today_start.replace(hour=23, minute=59, second=59)
         
-        todays_bookings = Booking.query.join(AvailabilitySlot).filter(
+        # The schedule shows slot times, client and service: the slot comes from
+        # the JOIN already made for filtering, client and service in the same query
+        todays_bookings = Booking.query.join(AvailabilitySlot).options(
+            contains_eager(Booking.slot),
+            joinedload(Booking.client),
+            joinedload(Booking.service)
+        ).filter(
             AvailabilitySlot.provider_id == current_user.id,
             AvailabilitySlot.start_time >= today_start,
             AvailabilitySlot.start_time <= today_end
         ).order_by(AvailabilitySlot.start_time).all()
 
-        # Personal Analytics Graphs - Using Line Chart and Pie Chart (as per PDF)
-        plt.style.use('default')
-
-        # Graph 1: Earnings Trend - LINE CHART (plt.plot)
-        earnings_data = db.session.query(
-            func.date(Order.completed_at), func.sum(Order.total_price)
-        ).filter(
-            Order.seller_id == current_user.id,
-            Order.status == 'completed',
-            Order.completed_at != None
-        ).group_by(func.date(Order.completed_at)).order_by(func.date(Order.completed_at)).all()
+        # Personal Analytics Graphs - Line Chart and Pie Chart, drawn in the
+        # browser by Chart.js (static/js/dashboard_charts.js) from the series below
+        # Graph 1: Earnings Trend - LINE CHART (monthly totals, last DASHBOARD_TREND_MONTHS)
+        trend_start = dashboard_trend_start()
+        bucket = month_bucket(Order.completed_at)
+        # Core select: plain (month, total) tuples, no ORM row processing
+        earnings_data = db.session.execute(
+            select(bucket, func.sum(Order.total_price)).where(
+                Order.seller_id == current_user.id,
+                Order.status == 'completed',
+                Order.completed_at >= trend_start
+            ).group_by(bucket).order_by(bucket)
+        ).all()
 
         dates_earn = []
         values_earn = []
         if earnings_data:
-            dates_earn = [str(r[0])[-5:] for r in earnings_data]  # Show MM-DD format
+            dates_earn = [r[0] for r in earnings_data]  # YYYY-MM
             values_earn = [float(r[1]) for r in earnings_data]
         else:
             dates_earn = ['No Data']
             values_earn = [0]
 
-        # LINE CHART - Simple as per PDF syntax: plt.plot(x, y)
-        fig1 = plt.figure(figsize=(8, 4))
-        plt.plot(dates_earn, values_earn, color='green', marker='o', linestyle='-', linewidth=2)
-        plt.title('My Earnings Trend', fontsize=12, fontweight='bold')
-        plt.xlabel('Date')
-        plt.ylabel('Earnings (₹)')
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        img1 = io.BytesIO()
-        fig1.savefig(img1, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-        img1.seek(0)
-        earnings_graph = base64.b64encode(img1.getvalue()).decode()
-        plt.close(fig1)
-
-        # Graph 2: Service Views Distribution - PIE CHART (plt.pie)
-        my_services = Service.query.filter_by(user_id=current_user.id).all()
-        top_services = sorted(my_services, key=lambda s: s.view_count, reverse=True)[:5]
-
-        if top_services and sum(s.view_count for s in top_services) > 0:
+        earnings_chart = {'type': 'line', 'title': 'My Earnings Trend', 'label': 'Earnings (₹)', 'xlabel': 'Month',
+                          'labels': dates_earn, 'values': values_earn, 'color': 'green'}
+
+        # Graph 2: Service Views Distribution - PIE CHART
+        # Top 5 picked by the database (index on user_id, view_count), only the two plotted columns
+        top_services = db.session.query(Service.title, Service.view_count)\
+            .filter(Service.user_id == current_user.id)\
+            .order_by(Service.view_count.desc()).limit(5).all()
+
+        if top_services and sum(s.view_count or 0 for s in top_services) > 0:
             svc_names = [s.title[:15] + '...' if len(s.title) > 15 else s.title for s in top_services]
-            svc_views = [s.view_count for s in top_services]
+            svc_views = [s.view_count or 0 for s in top_services]
         else:
             svc_names = ['No Views Yet']
             svc_views = [1]
 
-        # PIE CHART - Simple as per PDF syntax: plt.pie(sizes, labels=labels)
-        fig2 = plt.figure(figsize=(8, 5))
-        colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#C9CBCF', '#7CFC00', '#FF1493', '#00CED1']
-        plt.pie(svc_views, labels=svc_names, autopct='%1.1f%%', colors=colors[:len(svc_views)], startangle=90)
-        plt.title('Service Views Distribution', fontsize=12, fontweight='bold')
-        plt.axis('equal')
-        plt.tight_layout()
-
-        img2 = io.BytesIO()
-        fig2.savefig(img2, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-        img2.seek(0)
-        services_graph = base64.b64encode(img2.getvalue()).decode()
-        plt.close(fig2)
+        services_chart = {'type': 'pie', 'title': 'Service Views Distribution',
+                          'labels': svc_names, 'values': svc_views}
 
         return render_template('user/provider_dashboard.html',
                              services=services,
                              orders=orders,
                              stats=stats,
                              todays_bookings=todays_bookings,
-                             earnings_graph=earnings_graph,
-                             services_graph=services_graph)
+                             earnings_chart=earnings_chart,
+                             services_chart=services_chart)
     else:
         # Client dashboard
         orders = order_manager.get_user_orders(current_user.id, as_buyer=True)
         favorites = Favorite.query.filter_by(user_id=current_user.id).all()
         recommendations = service_manager.get_recommendations(current_user, limit=6)
         
-        # Calculate session stats
-        sessions_to_schedule = 0
-        upcoming_sessions = 0
-        
-        for order in orders:
-            # Check if order has a booking
-            booking = Booking.query.filter_by(order_id=order.id).first()
-            if not booking and order.status not in ['cancelled', 'completed']:
-                sessions_to_schedule += 1
-            elif booking and booking.slot.start_time > datetime.now(timezone.utc).replace(tzinfo=None):
-                upcoming_sessions += 1
-        
-        # --- Client Analytics Graphs - Using Line Chart and Pie Chart (as per PDF) ---
-        plt.style.use('default') 
-
-        # Graph 1: Spending Trend - LINE CHART (plt.plot)
-        spending_data = db.session.query(
-            func.date(Order.created_at), func.sum(Order.total_price)
-        ).filter(
-            Order.buyer_id == current_user.id
-        ).group_by(func.date(Order.created_at)).order_by(func.date(Order.created_at)).all()
+        # Calculate session stats: every order with its booking slot (if any)
+        # in one outer-joined query instead of a Booking lookup per order
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        session_rows = db.session.query(Order.status, Booking.id, AvailabilitySlot.start_time)\
+            .outerjoin(Booking, Booking.order_id == Order.id)\
+            .outerjoin(AvailabilitySlot, AvailabilitySlot.id == Booking.slot_id)\
+            .filter(Order.buyer_id == current_user.id).all()
+        
+        sessions_to_schedule = sum(1 for status, booking_id, _ in session_rows
+                                   if booking_id is None and status not in ['cancelled', 'completed'])
+        upcoming_sessions = sum(1 for _, booking_id, start_time in session_rows
+                                if booking_id is not None and start_time and start_time > now)
+        stats['sessions_to_schedule'] = sessions_to_schedule
+        stats['upcoming_sessions'] = upcoming_sessions
+        
+        # --- Client Analytics Graphs - Line Chart and Pie Chart (Chart.js in the browser) ---
+        # Graph 1: Spending Trend - LINE CHART (monthly totals, last DASHBOARD_TREND_MONTHS)
+        trend_start = dashboard_trend_start()
+        bucket = month_bucket(Order.created_at)
+        spending_data = db.session.execute(
+            select(bucket, func.sum(Order.total_price)).where(
+                Order.buyer_id == current_user.id,
+                Order.created_at >= trend_start
+            ).group_by(bucket).order_by(bucket)
+        ).all()
 
         dates_spend = []
         values_spend = []
         if spending_data:
-            dates_spend = [str(r[0])[-5:] for r in spending_data]  # Show MM-DD format
+            dates_spend = [r[0] for r in spending_data]  # YYYY-MM
             values_spend = [float(r[1]) for r in spending_data]
         else:
             dates_spend = ['No Data']
             values_spend = [0]
 
-        # LINE CHART - Simple as per PDF syntax: plt.plot(x, y)
-        fig3 = plt.figure(figsize=(8, 4))
-        plt.plot(dates_spend, values_spend, color='blue', marker='o', linestyle='-', linewidth=2)
-        plt.title('My Spending Trend', fontsize=12, fontweight='bold')
-        plt.xlabel('Date')
-        plt.ylabel('Amount (₹)')
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        img3 = io.BytesIO()
-        fig3.savefig(img3, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-        img3.seek(0)
-        spending_graph = base64.b64encode(img3.getvalue()).decode()
-        plt.close(fig3)
-
-
-        # Graph 2: Category Distribution - PIE CHART (plt.pie)
-        cat_data = db.session.query(
-            Category.name, func.count(Order.id)
-        ).select_from(Order).join(Service).join(Category).filter(
-            Order.buyer_id == current_user.id
-        ).group_by(Category.name).all()
+        spending_chart = {'type': 'line', 'title': 'My Spending Trend', 'label': 'Amount (₹)', 'xlabel': 'Month',
+                          'labels': dates_spend, 'values': values_spend, 'color': 'blue'}
+
+        # Graph 2: Category Distribution - PIE CHART
+        cat_data = db.session.execute(
+            select(Category.name, func.count(Order.id))
+            .select_from(Order).join(Service).join(Category)
+            .where(Order.buyer_id == current_user.id)
+            .group_by(Category.name)
+        ).all()
 
         if cat_data:
             labels = [r[0] for r in cat_data]
@@ -1154,27 +1458,16 @@ def dashboard():
             labels = ['No Orders']
             sizes = [1]
 
-        # PIE CHART - Simple as per PDF syntax: plt.pie(sizes, labels=labels)
-        fig4 = plt.figure(figsize=(8, 5))
-        colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#C9CBCF', '#7CFC00', '#FF1493', '#00CED1']
-        plt.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors[:len(sizes)], startangle=90)
-        plt.title('Orders by Category', fontsize=12, fontweight='bold')
-        plt.axis('equal')
-        plt.tight_layout()
-        
-        img4 = io.BytesIO()
-        fig4.savefig(img4, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-        img4.seek(0)
-        distribution_graph = base64.b64encode(img4.getvalue()).decode()
-        plt.close(fig4)
+        distribution_chart = {'type': 'pie', 'title': 'Orders by Category',
+                              'labels': labels, 'values': sizes}
         
         return render_template('user/client_dashboard.html',
                              stats=stats,
                              orders=orders,
                              favorites=favorites,
                              recommendations=recommendations,
-                             spending_graph=spending_graph,
-                             distribution_graph=distribution_graph)
+                             spending_chart=spending_chart,
+                             distribution_chart=distribution_chart)
 
 
 @user_bp.route('/notifications/mark-read/<int:notification_id>', methods=['POST'])
@@ -1182,7 +1475,7 @@ def dashboard():
 def mark_notification_read(notification_id):
     """Mark notification as read"""
     notification_manager.mark_as_read(notification_id)
-    return jsonify({'status': 'success'})
+    return '', 204  # No Content: nothing for the client to parse
 
 
 @user_bp.route('/notifications/mark-all-read', methods=['POST'])
@@ -1190,7 +1483,7 @@ def mark_notification_read(notification_id):
 def mark_all_notifications_read():
     """Mark all notifications as read"""
     notification_manager.mark_all_read(current_user.id)
-    return jsonify({'status': 'success'})
+    return '', 204
 
 
 @user_bp.route('/notifications/delete/<int:notification_id>', methods=['POST'])
@@ -1198,7 +1491,7 @@ def mark_all_notifications_read():
 def delete_notification(notification_id):
     """Delete a notification"""
     notification_manager.delete_notification(notification_id)
-    return jsonify({'status': 'success'})
+    return '', 204
 
 
 @user_bp.route('/notifications/clear-all', methods=['POST'])
@@ -1206,20 +1499,36 @@ def delete_notification(notification_id):
 def clear_all_notifications():
     """Clear all notifications"""
     notification_manager.clear_all(current_user.id)
-    return jsonify({'status': 'success'})
+    return '', 204
+
+
+# Notifications shown per page (older ones via the ?before= cursor)
+NOTIFICATIONS_PAGE_SIZE = 50
 
 
 @user_bp.route('/notifications')
 @login_required
 def notifications():
-    """View all notifications page"""
-    # Get all notifications for the current user (not just recent 5)
-    all_notifications = current_user.notifications.order_by(db.text('created_at desc')).all()
-    
-    # Mark all as read when viewing the page
+    """View notifications page, newest first, one page at a time"""
+    # Mark all as read when viewing the page. Done first: a commit after
+    # loading would expire the list and reload every notification one by one
     notification_manager.mark_all_read(current_user.id)
     
-    return render_template('user/notifications.html', notifications=all_notifications)
+    # Keyset paging on the id (ids follow creation order): the query seeks
+    # past the cursor instead of loading the user's whole history
+    query = current_user.notifications.order_by(Notification.id.desc())
+    before = request.args.get('before', type=int)
+    if before:
+        query = query.filter(Notification.id < before)
+    
+    page = query.limit(NOTIFICATIONS_PAGE_SIZE + 1).all()
+    next_cursor = None
+    if len(page) > NOTIFICATIONS_PAGE_SIZE:
+        page = page[:NOTIFICATIONS_PAGE_SIZE]
+        next_cursor = page[-1].id
+    
+    return render_template('user/notifications.html', notifications=page,
+                         next_cursor=next_cursor, is_first_page=not before)
 
 
 
@@ -1268,18 +1577,21 @@ def order_action(order_id, action):
             flash('Cannot accept order yet. Please approve the booking request in "Manage Availability" first.', 'warning')
             return redirect(url_for('user.order_detail', order_id=order_id))
 
-        if order_manager.accept_order(order_id):
+        # Status change and buyer notification go out in one commit
+        if order_manager.accept_order(order_id, commit=False):
+            notification_manager.create_notification(order.buyer_id, f"Order #{order.id} Accepted", f"Your order for {order.service.title} has been accepted.", url_for('user.order_detail', order_id=order.id), commit=False)
+            db.session.commit()
             flash('Order accepted! You can now chat with the client.', 'success')
-            notification_manager.create_notification(order.buyer_id, f"Order #{order.id} Accepted", f"Your order for {order.service.title} has been accepted.", url_for('user.order_detail', order_id=order.id))
             
             # Send acceptance emails
             from email_utils import send_order_accepted_emails
             send_order_accepted_emails(order)
             
     elif action == 'complete':
-        if order_manager.complete_order(order_id):
+        if order_manager.complete_order(order_id, commit=False):
+            notification_manager.create_notification(order.buyer_id, f"Order #{order.id} Completed", f"Your order for {order.service.title} is ready!", url_for('user.order_detail', order_id=order.id), commit=False)
+            db.session.commit()
             flash('Order marked as complete!', 'success')
-            notification_manager.create_notification(order.buyer_id, f"Order #{order.id} Completed", f"Your order for {order.service.title} is ready!", url_for('user.order_detail', order_id=order.id))
             
             # Send completion emails
             from email_utils import send_order_completed_emails
@@ -1293,14 +1605,15 @@ def send_message(order_id):
     """Send chat message"""
     content = request.form.get('content')
     if content:
-        msg, error = chat_manager.send_message(order_id, current_user.id, content)
+        msg, error = chat_manager.send_message(order_id, current_user.id, content, commit=False)
         if error:
             flash(error, 'danger')
         else:
-            # Notify receiver
-            order = Order.query.get(order_id)
+            # Notify receiver; message and notification share one commit
+            order = db.session.get(Order, order_id)
             receiver_id = order.buyer_id if current_user.id == order.seller_id else order.seller_id
-            notification_manager.create_notification(receiver_id, "New Message", f"New message from {current_user.username}", url_for('user.order_detail', order_id=order_id))
+            notification_manager.create_notification(receiver_id, "New Message", f"New message from {current_user.username}", url_for('user.order_detail', order_id=order_id), commit=False)
+            db.session.commit()
             
     return redirect(url_for('user.order_detail', order_id=order_id))
 
@@ -1343,23 +1656,22 @@ def settings():
         Rendered template or redirect
     """
     if request.method == 'POST':
-        # Update profile
-        current_user.full_name = request.form.get('full_name', '')
-        current_user.bio = request.form.get('bio', '')
-        current_user.bio = request.form.get('bio', '')
-        current_user.phone = request.form.get('phone', '')
+        # Profile fields, written below in a single UPDATE
+        profile = {
+            'full_name': request.form.get('full_name', ''),
+            'bio': request.form.get('bio', ''),
+            'phone': request.form.get('phone', ''),
+        }
         
         # Handle Avatar Upload
         if 'avatar' in request.files:
             file = request.files['avatar']
             if file and file.filename != '':
                 filename = save_uploaded_file(file, folder='avatars')
-                # Update user avatar field (assuming model has avatar_url or similar)
-                # Checking models.py next, but applying common pattern
                 if filename:
-                    current_user.avatar_url = filename
+                    profile['avatar_url'] = filename
         
-        # Update password if provided
+        # Update password if provided (hashed in Python, so kept on the ORM object)
         new_password = request.form.get('new_password')
         if new_password:
             current_password = request.form.get('current_password')
@@ -1370,6 +1682,7 @@ def settings():
                 flash('Current password is incorrect.', 'danger')
                 return render_template('user/settings.html')
         
+        db.session.execute(update(User).where(User.id == current_user.id).values(**profile))
         db.session.commit()
         flash('Settings updated successfully!', 'success')
         return redirect(url_for('user.settings'))
@@ -1440,9 +1753,8 @@ def orders():
     Returns:
         Rendered template
     """
-    # Get orders as buyer and seller
-    orders_as_buyer = order_manager.get_user_orders(current_user.id, as_buyer=True)
-    orders_as_seller = order_manager.get_user_orders(current_user.id, as_buyer=False)
+    # Get orders as buyer and seller (one query, split by role)
+    orders_as_buyer, orders_as_seller = order_manager.get_user_orders_by_role(current_user.id)
     
     return render_template('user/orders.html',
                          orders_as_buyer=orders_as_buyer,
@@ -1467,12 +1779,8 @@ def wallet():
     Returns:
         Rendered template
     """
-    # Import payment system classes
-    from payment_system import WalletManager, PaymentGateway
-    
-    # Initialize wallet manager
-    gateway = PaymentGateway()
-    wallet_mgr = WalletManager(payment_gateway=gateway)
+    # Shared wallet manager (created in create_app)
+    wallet_mgr = current_app.wallet_manager
     
     # Get wallet balance for current user
     wallet_balance = wallet_mgr.get_balance(current_user.id)
@@ -1498,7 +1806,7 @@ def add_money():
     Returns:
         JSON response with transaction result
     """
-    from payment_system import WalletManager, PaymentGateway, CustomException
+    from payment_system import CustomException
     
     try:
         data = request.get_json()
@@ -1508,8 +1816,7 @@ def add_money():
         if amount <= 0:
             return jsonify({'success': False, 'error': 'Invalid amount'})
         
-        gateway = PaymentGateway()
-        wallet_mgr = WalletManager(payment_gateway=gateway)
+        wallet_mgr = current_app.wallet_manager
         
         # Process payment and add to wallet
         result = wallet_mgr.add_money(
@@ -1543,7 +1850,7 @@ def deduct_money():
     Returns:
         JSON response with transaction result
     """
-    from payment_system import WalletManager, PaymentGateway, InsufficientBalanceException, CustomException
+    from payment_system import InsufficientBalanceException, CustomException
     
     try:
         data = request.get_json()
@@ -1553,8 +1860,7 @@ def deduct_money():
         if amount <= 0:
             return jsonify({'success': False, 'error': 'Invalid amount'})
         
-        gateway = PaymentGateway()
-        wallet_mgr = WalletManager(payment_gateway=gateway)
+        wallet_mgr = current_app.wallet_manager
         
         # Check balance and deduct
         result = wallet_mgr.deduct_money(
@@ -1592,10 +1898,7 @@ def get_balance():
     Returns:
         JSON response with balance
     """
-    from payment_system import WalletManager
-    
-    wallet_mgr = WalletManager()
-    balance = wallet_mgr.get_balance(current_user.id)
+    balance = current_app.wallet_manager.get_balance(current_user.id)
     
     return jsonify({
         'success': True,
@@ -1603,6 +1906,10 @@ def get_balance():
     })
 
 
+# Transactions loaded per page (older ones via the ?before= cursor)
+TRANSACTIONS_PAGE_SIZE = 50
+
+
 @user_bp.route('/transactions')
 @login_required
 def transactions():
@@ -1610,20 +1917,29 @@ def transactions():
     Transaction history page
     
     Displays:
-    - All user transactions
+    - One page of user transactions (newest first)
     - Filter options
     - Export functionality
     
     Returns:
         Rendered template
     """
-    from payment_system import PaymentGateway
+    from payment_system import CustomException
     
-    gateway = PaymentGateway()
-    user_transactions = gateway.get_user_transactions(current_user.id)
+    before = request.args.get('before')
+    try:
+        user_transactions, next_cursor = current_app.payment_gateway.get_user_transactions_page(
+            current_user.id, TRANSACTIONS_PAGE_SIZE, before=before)
+    except CustomException:
+        if not before:
+            raise
+        # Bad cursor: start again from the newest page
+        return redirect(url_for('user.transactions'))
     
     return render_template('user/transactions.html',
-                         transactions=user_transactions)
+                         transactions=user_transactions,
+                         next_cursor=next_cursor,
+                         is_first_page=not before)
 
 
 @user_bp.route('/transactions/export')
@@ -1635,26 +1951,26 @@ def export_transactions():
     Returns:
         CSV file download
     """
-    from payment_system import PaymentGateway, TransactionFilter
+    from payment_system import TransactionFilter
     from flask import Response
     
-    gateway = PaymentGateway()
-    transactions = gateway.get_user_transactions(current_user.id)
-    
-    # Generate CSV content
-    csv_content = TransactionFilter.export_to_csv(
-        transactions,
-        filename=f'transactions_{current_user.id}.csv'
-    )
+    # Stream rows straight from the transactions cursor into the response
+    transactions = current_app.payment_gateway.iter_user_transactions(current_user.id)
     
     # Return as downloadable file
     return Response(
-        csv_content,
+        TransactionFilter.iter_csv(transactions),
         mimetype='text/csv',
         headers={'Content-Disposition': f'attachment;filename=transactions_{current_user.id}.csv'}
     )
 
 
+# Transactions never change once written, so an invoice is rendered once,
+# kept in the shared cache and marked immutable for the browser
+INVOICE_CACHE_TTL = 86400
+INVOICE_MAX_AGE = 31536000
+
+
 @user_bp.route('/invoice/<txn_id>')
 @login_required
 def get_invoice(txn_id):
@@ -1665,28 +1981,40 @@ def get_invoice(txn_id):
         txn_id: Transaction ID
         
     Returns:
-        HTML invoice or JSON error
+        HTML invoice (304 if the browser's copy is current) or JSON error
     """
-    from payment_system import PaymentGateway, InvoiceGenerator, TransactionNotFoundException
+    from payment_system import InvoiceGenerator, TransactionNotFoundException
+    
+    asset_version = current_app.config['ASSET_VERSION']
+    # Keyed by user so a cache hit is only ever one the owner was served
+    cache_key = f'invoice:{current_user.id}:{txn_id}:{asset_version}'
     
     try:
-        gateway = PaymentGateway()
-        transaction = gateway.get_transaction(txn_id)
-        
-        # Verify transaction belongs to current user
-        if str(transaction.get('user_id')) != str(current_user.id):
-            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
-        
-        # Generate invoice HTML
-        invoice_gen = InvoiceGenerator()
-        invoice_html = invoice_gen.generate_invoice_html(transaction)
-        
-        return invoice_html
+        invoice_html = cache.get(cache_key)
+        if invoice_html is None:
+            transaction = current_app.payment_gateway.get_transaction(txn_id)
+            
+            # Verify transaction belongs to current user
+            if str(transaction.get('user_id')) != str(current_user.id):
+                return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+            
+            # Generate invoice HTML
+            invoice_gen = InvoiceGenerator()
+            css_href = url_for('static', filename='css/invoice.css', v=asset_version)
+            invoice_html = invoice_gen.generate_invoice_html(transaction, css_href=css_href)
+            cache.set(cache_key, invoice_html, timeout=INVOICE_CACHE_TTL)
         
     except TransactionNotFoundException:
         return jsonify({'success': False, 'error': 'Transaction not found'}), 404
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+    
+    response = make_response(invoice_html)
+    response.set_etag(f'{txn_id}-{asset_version}')
+    response.cache_control.private = True
+    response.cache_control.max_age = INVOICE_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
 
 
 # ============================================================================
@@ -1707,98 +2035,38 @@ def dashboard():
     Returns:
         Rendered template
     """
-    # Get statistics
-    total_users = User.query.count()
-    total_services = Service.query.filter_by(is_active=True).count()
-    total_orders = Order.query.count()
-    total_reviews = Review.query.count()
+    # Get statistics: four scalar subqueries in one SELECT (one round-trip)
+    counts = db.session.execute(select(
+        select(func.count(User.id)).scalar_subquery().label('users'),
+        select(func.count(Service.id)).filter_by(is_active=True).scalar_subquery().label('services'),
+        select(func.count(Order.id)).scalar_subquery().label('orders'),
+        select(func.count(Review.id)).scalar_subquery().label('reviews')
+    )).one()
     
     # Get recent users
-    recent_users = User.query.order_by(User.created_at.desc()).limit(10).all()
+    recent_users = db.session.scalars(select(User).order_by(User.created_at.desc()).limit(10)).all()
     
     # Get recent services
-    recent_services = Service.query.order_by(Service.created_at.desc()).limit(10).all()
+    recent_services = db.session.scalars(select(Service).order_by(Service.created_at.desc()).limit(10)).all()
     
     # Get recent orders
-    recent_orders = Order.query.order_by(Order.created_at.desc()).limit(10).all()
+    recent_orders = db.session.scalars(select(Order).order_by(Order.created_at.desc()).limit(10)).all()
 
-    # --- Generate Graphs (Optimized for Admin Dashboard) ---
-    # REPLACED Revenue Graph with User Growth Graph (Platform Adoption)
-    
-    plt.style.use('fivethirtyeight')
+    # Graph data for Chart.js (same spec format as the user dashboards)
+    dates, signups = _user_growth_data()
+    growth_chart = {'type': 'line', 'title': 'User Growth (New Signups)', 'label': 'New Users',
+                    'labels': dates or ['No Data'], 'values': signups or [0], 'color': '#198754'}
     
-    # Graph 1: User Growth (New Signups per Day)
-    # Suited for: Tracking platform adoption and marketing effectiveness
-    user_data = db.session.query(
-        func.date(User.created_at), func.count(User.id)
-    ).group_by(func.date(User.created_at)).order_by(func.date(User.created_at)).all()
-    
-    dates_curr = []
-    values_curr = []
-    if user_data:
-        dates_curr = [str(r[0]) for r in user_data]
-        values_curr = [int(r[1]) for r in user_data]
-    else:
-        dates_curr = ['No Data']
-        values_curr = [0]
-
-    fig1 = plt.figure(figsize=(10, 5))
-    ax1 = plt.gca()
-    # Plot formatting: Green line for growth
-    ax1.plot(dates_curr, values_curr, color='#198754', linewidth=3, marker='o', markersize=8)
-    ax1.fill_between(dates_curr, values_curr, color='#198754', alpha=0.15)
-    
-    ax1.set_title('User Growth (New Signups)', fontsize=14, fontweight='bold', pad=15)
-    ax1.set_ylabel('New Users', fontsize=12)
-    plt.xticks(rotation=45, fontsize=10)
-    plt.yticks(fontsize=10)
-    plt.tight_layout()
-    
-    # Save Graph 1
-    img1 = io.BytesIO()
-    fig1.savefig(img1, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-    img1.seek(0)
-    user_graph = base64.b64encode(img1.getvalue()).decode()
-    plt.close(fig1)
-
-    # Graph 2: Top Categories (Bar Chart)
-    # Suited for: Understanding market demand
-    cat_data = db.session.query(Category.name, func.count(Service.id)).outerjoin(Service).group_by(Category.name).order_by(func.count(Service.id).desc()).limit(8).all()
-    
-    if cat_data:
-        cat_names = [r[0] for r in cat_data]
-        cat_counts = [r[1] for r in cat_data]
-        # Reverse for horizontal bar chart
-        cat_names.reverse()
-        cat_counts.reverse()
-    else:
-        cat_names = ['No Categories']
-        cat_counts = [0]
-
-    fig2 = plt.figure(figsize=(10, 5))
-    ax2 = plt.gca()
-    # Plot formatting: Distinct colors for bars
-    colors = plt.cm.Paired(np.arange(len(cat_names)))
-    bars = ax2.barh(cat_names, cat_counts, color=colors)
-    
-    ax2.set_title('Top Service Categories', fontsize=14, fontweight='bold', pad=15)
-    ax2.set_xlabel('Number of Services', fontsize=12)
-    plt.xticks(fontsize=10)
-    plt.yticks(fontsize=10)
-    plt.tight_layout()
-    
-    # Save Graph 2
-    img2 = io.BytesIO()
-    fig2.savefig(img2, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-    img2.seek(0)
-    category_graph = base64.b64encode(img2.getvalue()).decode()
-    plt.close(fig2)
+    cat_names, cat_counts = _top_categories_data()
+    categories_chart = {'type': 'bar', 'horizontal': True, 'title': 'Top Service Categories',
+                        'label': 'Number of Services', 'labels': cat_names or ['No Categories'],
+                        'values': cat_counts or [0]}
     
     stats = {
-        'total_users': total_users,
-        'total_services': total_services,
-        'total_orders': total_orders,
-        'total_reviews': total_reviews
+        'total_users': counts.users,
+        'total_services': counts.services,
+        'total_orders': counts.orders,
+        'total_reviews': counts.reviews
     }
     
     return render_template('admin/dashboard.html',
@@ -1806,8 +2074,79 @@ def dashboard():
                          recent_users=recent_users,
                          recent_services=recent_services,
                          recent_orders=recent_orders,
-                         user_graph=user_graph,
-                         category_graph=category_graph)
+                         growth_chart=growth_chart,
+                         categories_chart=categories_chart)
+
+
+# --- Admin Dashboard Graphs ---
+# Drawn in the browser by Chart.js (static/js/dashboard_charts.js); the
+# aggregates behind them are reused this long (seconds)
+ADMIN_GRAPH_DATA_TTL = 60
+
+
+@cache.memoize(timeout=ADMIN_GRAPH_DATA_TTL)
+def _user_growth_data():
+    """
+    New signups per day from the first signup to today, oldest first
+    
+    DBMS: A recursive CTE generates every day in the range and the users
+    are counted per day with a LEFT JOIN, so days without signups come back
+    as 0 and the series is dense. The join is a created_at range (not
+    date(created_at)) so it can use the index on users.created_at.
+    
+    Returns:
+        tuple: (dates, counts) as tuples
+    """
+    if db.engine.dialect.name == 'sqlite':
+        next_day = lambda d: func.date(d, '+1 day')
+        today = func.date('now')
+    else:
+        next_day = lambda d: d + 1  # date + integer -> date
+        today = func.current_date()
+    
+    days = select(func.min(func.date(User.created_at)).label('d')).cte('days', recursive=True)
+    days = days.union_all(select(next_day(days.c.d)).where(days.c.d < today))
+    
+    rows = db.session.execute(
+        select(days.c.d, func.count(User.id))
+        .select_from(days)
+        .outerjoin(User, db.and_(User.created_at >= days.c.d, User.created_at < next_day(days.c.d)))
+        .where(days.c.d.isnot(None))
+        .group_by(days.c.d).order_by(days.c.d)
+    ).all()
+    return tuple(str(r[0]) for r in rows), tuple(int(r[1]) for r in rows)
+
+
+@cache.memoize(timeout=ADMIN_GRAPH_DATA_TTL)
+def _top_categories_data():
+    """
+    The 8 categories with the most services, largest first
+    
+    Returns:
+        tuple: (category names, service counts) as tuples
+    """
+    rows = db.session.execute(
+        select(Category.name, func.count(Service.id)).outerjoin(Service)
+        .group_by(Category.name).order_by(func.count(Service.id).desc()).limit(8)
+    ).all()
+    return tuple(r[0] for r in rows), tuple(r[1] for r in rows)
+
+
+ADMIN_PAGE_SIZE = 50
+
+
+def admin_page(query):
+    """
+    Paginate an admin list query using the ?page= argument
+
+    Args:
+        query: Ordered query for the list
+
+    Returns:
+        Pagination object (out-of-range pages come back empty)
+    """
+    page = request.args.get('page', 1, type=int)
+    return query.paginate(page=page, per_page=ADMIN_PAGE_SIZE, error_out=False)
 
 
 @admin_bp.route('/users')
@@ -1819,8 +2158,8 @@ def users():
     Returns:
         Rendered template
     """
-    users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('admin/users.html', users=users)
+    pagination = admin_page(User.query.order_by(User.created_at.desc()))
+    return render_template('admin/users.html', users=pagination.items, pagination=pagination)
 
 
 @admin_bp.route('/users/<int:user_id>/toggle-status', methods=['POST'])
@@ -1835,18 +2174,24 @@ def toggle_user_status(user_id):
     Returns:
         Redirect
     """
-    user = User.query.get_or_404(user_id)
-    
     # SECURITY: Prevent admin from deactivating themselves
-    if user.id == current_user.id:
+    if user_id == current_user.id:
         flash('You cannot deactivate your own account!', 'danger')
         return redirect(url_for('admin.users'))
     
-    user.is_active = not user.is_active
+    # Flip the flag in SQL: one UPDATE ... RETURNING, no read-modify-write race
+    row = db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_active=~User.is_active)
+        .returning(User.username, User.is_active)
+    ).first()
+    if row is None:
+        abort(404)
     db.session.commit()
     
-    status = 'activated' if user.is_active else 'deactivated'
-    flash(f'User {user.username} has been {status}.', 'success')
+    status = 'activated' if row.is_active else 'deactivated'
+    flash(f'User {row.username} has been {status}.', 'success')
     return redirect(url_for('admin.users'))
 
 
@@ -1859,8 +2204,8 @@ def services():
     Returns:
         Rendered template
     """
-    services = Service.query.order_by(Service.created_at.desc()).all()
-    return render_template('admin/services.html', services=services)
+    pagination = admin_page(Service.query.order_by(Service.created_at.desc()))
+    return render_template('admin/services.html', services=pagination.items, pagination=pagination)
 
 
 @admin_bp.route('/categories', methods=['GET', 'POST'])
@@ -1890,7 +2235,7 @@ def categories():
         
         return redirect(url_for('admin.categories'))
     
-    categories = category_manager.get_all_categories()
+    categories = category_manager.get_category_stats()
     return render_template('admin/categories.html', categories=categories)
 
 
@@ -1903,8 +2248,8 @@ def orders():
     Returns:
         Rendered template
     """
-    orders = Order.query.order_by(Order.created_at.desc()).all()
-    return render_template('admin/orders.html', orders=orders)
+    pagination = admin_page(Order.query.order_by(Order.created_at.desc()))
+    return render_template('admin/orders.html', orders=pagination.items, pagination=pagination)
 
 
 @admin_bp.route('/bookings')
@@ -1912,8 +2257,13 @@ def orders():
 @admin_required
 def bookings():
     """Admin page to view all bookings"""
-    bookings = Booking.query.order_by(Booking.created_at.desc()).all()
-    return render_template('admin/bookings.html', bookings=bookings)
+    # Slot (with provider), client and service loaded with the bookings
+    pagination = admin_page(Booking.query.options(
+        joinedload(Booking.slot).joinedload(AvailabilitySlot.provider),
+        joinedload(Booking.client),
+        joinedload(Booking.service)
+    ).order_by(Booking.created_at.desc()))
+    return render_template('admin/bookings.html', bookings=pagination.items, pagination=pagination)
 
 
 @admin_bp.route('/availability')
@@ -1921,7 +2271,11 @@ def bookings():
 @admin_required
 def availability():
     """Admin page to view all availability slots"""
-    slots = AvailabilitySlot.query.order_by(AvailabilitySlot.start_time.desc()).all()
+    # Provider and booking (with client) loaded with the slots
+    slots = AvailabilitySlot.query.options(
+        joinedload(AvailabilitySlot.provider),
+        joinedload(AvailabilitySlot.booking).joinedload(Booking.client)
+    ).order_by(AvailabilitySlot.start_time.desc()).all()
     return render_template('admin/availability.html', slots=slots)
 
 
@@ -1929,8 +2283,8 @@ def availability():
 @admin_required
 def messages():
     """Contact messages"""
-    messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).all()
-    return render_template('admin/messages.html', messages=messages)
+    pagination = admin_page(ContactMessage.query.order_by(ContactMessage.created_at.desc()))
+    return render_template('admin/messages.html', messages=pagination.items, pagination=pagination)
 
 
 # ============================================================================
@@ -1938,6 +2292,7 @@ def messages():
 # ============================================================================
 
 @api_bp.route('/search/autocomplete')
+@public_json
 def search_autocomplete():
     """
     Autocomplete API for search
@@ -1955,6 +2310,7 @@ def search_autocomplete():
 
 
 @api_bp.route('/categories')
+@public_json
 def get_categories():
     """
     Get all categories
@@ -1967,6 +2323,7 @@ def get_categories():
 
 
 @api_bp.route('/services/featured')
+@public_json
 def get_featured_services():
     """
     Get featured services
@@ -2000,18 +2357,24 @@ def get_service_stats(service_id):
     Returns:
         JSON: Service stats
     """
-    service = Service.query.get_or_404(service_id)
+    # Counters live on the service row: one SELECT, no COUNT(*) per request
+    service = get_service_or_404(service_id, Service.id, Service.view_count, Service.favorite_count,
+                                 Service.review_count, Service.rating_sum)
     
     stats = {
         'views': service.view_count,
         'rating': service.get_average_rating(),
         'reviews': service.get_review_count(),
-        'favorites': service.favorited_by.count()
+        'favorites': service.favorite_count or 0
     }
     
     return jsonify(stats)
 
 
+# Display zone for notification times, resolved once at import
+NOTIFICATION_TZ = ZoneInfo('Asia/Kolkata')
+
+
 @api_bp.route('/notifications')
 @login_required
 def get_notifications():
@@ -2021,23 +2384,16 @@ def get_notifications():
     Returns:
         JSON: List of notifications with unread count
     """
-    import pytz
-    from datetime import datetime
-    
     notifications = current_user.get_recent_notifications(10)
     unread_count = current_user.get_unread_notifications_count()
     
-    # Convert to IST for display
-    ist_tz = pytz.timezone('Asia/Kolkata')
-    
     notifications_data = []
     for n in notifications:
-        # Convert created_at to IST
+        # Convert created_at (naive UTC in the DB) to IST
         created_at = n.created_at
         if created_at.tzinfo is None:
-            utc_tz = pytz.UTC
-            created_at = utc_tz.localize(created_at)
-        ist_time = created_at.astimezone(ist_tz)
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        ist_time = created_at.astimezone(NOTIFICATION_TZ)
         
         notifications_data.append({
             'id': n.id,
@@ -2065,8 +2421,13 @@ def manage():
     Provider Availability Management Page
     """
     from models import Booking, AvailabilitySlot
-    # Get pending bookings for this provider
-    pending_bookings = Booking.query.join(AvailabilitySlot).filter(
+    # Get pending bookings for this provider; the slot comes from the join itself
+    # and client/service are loaded with just the columns the table shows
+    pending_bookings = Booking.query.join(Booking.slot).options(
+        contains_eager(Booking.slot),
+        joinedload(Booking.client).load_only(User.id, User.username, User.avatar_url),
+        joinedload(Booking.service).load_only(Service.id, Service.title)
+    ).filter(
         AvailabilitySlot.provider_id == current_user.id,
         Booking.status == 'pending'
     ).all()
@@ -2098,12 +2459,12 @@ def get_my_slots():
     slots = availability_manager.get_provider_slots(current_user.id, start_date, end_date)
     
     events = []
-    for slot in slots:
+    for slot_id, start_time, end_time, is_booked, status in slots:
         color = '#28a745' # Green (Available)
         title = 'Available'
         
-        if slot.is_booked:
-            if slot.booking and slot.booking.status == 'pending':
+        if is_booked:
+            if status == 'pending':
                 color = '#ffc107' # Yellow (Pending)
                 title = 'Pending Request'
             else:
@@ -2111,24 +2472,20 @@ def get_my_slots():
                 title = 'Booked'
             
         events.append({
-            'id': slot.id,
+            'id': slot_id,
             'title': title,
             # Force UTC 'Z' so FullCalendar converts to local time
-            'start': slot.start_time.isoformat() + 'Z',
-            'end': slot.end_time.isoformat() + 'Z',
+            'start': start_time.isoformat() + 'Z',
+            'end': end_time.isoformat() + 'Z',
             'color': color,
             'extendedProps': {
-                'is_booked': slot.is_booked,
-                'status': slot.booking.status if slot.booking else None
+                'is_booked': is_booked,
+                'status': status
             }
         })
         
     return jsonify(events)
 
-
-
-
-
 @availability_bp.route('/api/slots/add', methods=['POST'])
 @provider_required
 def add_slot():
@@ -2184,26 +2541,20 @@ def get_provider_public_slots(provider_id):
         end_date = end_date.astimezone(timezone.utc).replace(tzinfo=None)
 
     slots = availability_manager.get_provider_slots(provider_id, start_date, end_date)
-    
-    events = []
     now = datetime.now(timezone.utc).replace(tzinfo=None)
     
-    for slot in slots:
-        # Only show available slots (not booked)
-        # Check explicitly for False to be safe
-        is_blocked = slot.is_booked
-        
-        if not is_blocked and slot.start_time > now:
-            events.append({
-                'id': slot.id,
-                'title': 'Available',
-                # Force UTC 'Z' for frontend timezone conversion
-                'start': slot.start_time.isoformat() + 'Z',
-                'end': slot.end_time.isoformat() + 'Z',
-                'color': '#28a745',
-                'display': 'block',
-                'extendedProps': {'booked': False}
-            })
+    # Only show available slots (not booked) that haven't started yet
+    events = [{
+        'id': slot_id,
+        'title': 'Available',
+        # Force UTC 'Z' for frontend timezone conversion
+        'start': start_time.isoformat() + 'Z',
+        'end': end_time.isoformat() + 'Z',
+        'color': '#28a745',
+        'display': 'block',
+        'extendedProps': {'booked': False}
+    } for slot_id, start_time, end_time, is_booked, _ in slots
+      if not is_booked and start_time > now]
         
     return jsonify(events)
 
@@ -2237,26 +2588,27 @@ def book_slot():
 @provider_required
 def approve_booking(booking_id):
     """Approve a booking request"""
-    success, error = availability_manager.approve_booking(booking_id, current_user.id)
+    # Booking, order and client notification are written in one commit
+    success, error = availability_manager.approve_booking(booking_id, current_user.id, commit=False)
     if success:
-        # Send confirmation email
-        from models import Booking, Notification
-        booking = Booking.query.get(booking_id)
+        from models import Booking
+        booking = db.session.get(Booking, booking_id)
+        
+        # Create notification for the client
+        slot_time = booking.slot.start_time.strftime('%d %b %Y at %I:%M %p')
+        notification_manager.create_notification(
+            booking.client_id,
+            'Booking Approved! ✅',
+            f'Your booking request with {current_user.username} for {slot_time} has been approved.',
+            url_for('user.dashboard'),
+            commit=False
+        )
+        db.session.commit()
+        
+        # Send confirmation email (queued on the background mail workers)
         from email_utils import send_booking_confirmation_email
-        if booking:
-            send_booking_confirmation_email(booking)
-            
-            # Create notification for the client
-            slot_time = booking.slot.start_time.strftime('%d %b %Y at %I:%M %p')
-            notification = Notification(
-                user_id=booking.client_id,
-                title='Booking Approved! ✅',
-                message=f'Your booking request with {current_user.username} for {slot_time} has been approved.',
-                link=url_for('user.dashboard')
-            )
-            db.session.add(notification)
-            db.session.commit()
-             
+        send_booking_confirmation_email(booking)
+        
         flash('Booking approved successfully!', 'success')
     else:
         flash(f'Error: {error}', 'danger')
@@ -2269,29 +2621,27 @@ def approve_booking(booking_id):
 @provider_required
 def reject_booking(booking_id):
     """Reject a booking request"""
-    # Get booking info BEFORE rejecting (so we have the slot time)
-    from models import Booking, Notification
-    booking = Booking.query.get(booking_id)
-    client_id = booking.client_id if booking else None
-    slot_time = booking.slot.start_time.strftime('%d %b %Y at %I:%M %p') if booking else ''
-    
-    success, error = availability_manager.reject_booking(booking_id, current_user.id)
+    # Booking and client notification are written in one commit
+    success, error = availability_manager.reject_booking(booking_id, current_user.id, commit=False)
     if success:
-        # Send rejection email
+        from models import Booking
+        booking = db.session.get(Booking, booking_id)
+        
+        # Create notification for the client
+        slot_time = booking.slot.start_time.strftime('%d %b %Y at %I:%M %p')
+        notification_manager.create_notification(
+            booking.client_id,
+            'Booking Declined ❌',
+            f'Your booking request with {current_user.username} for {slot_time} has been declined. Please try another time slot.',
+            url_for('user.dashboard'),
+            commit=False
+        )
+        db.session.commit()
+        
+        # Send rejection email (queued on the background mail workers)
         from email_utils import send_booking_rejection_email
-        if booking:
-            send_booking_rejection_email(booking)
-            
-            # Create notification for the client
-            notification = Notification(
-                user_id=client_id,
-                title='Booking Declined ❌',
-                message=f'Your booking request with {current_user.username} for {slot_time} has been declined. Please try another time slot.',
-                link=url_for('user.dashboard')
-            )
-            db.session.add(notification)
-            db.session.commit()
-             
+        send_booking_rejection_email(booking)
+        
         flash('Booking rejected.', 'warning')
     else:
         flash(f'Error: {error}', 'danger')
@@ -2310,6 +2660,10 @@ def bookings_list():
 # API ROUTES - Advanced Product/Service Search & Filter
 # ============================================================================
 
+# Upper bound on ?per_page= for the search API
+SEARCH_API_MAX_PER_PAGE = 100
+
+
 @api_bp.route('/services/search', methods=['GET'])
 def search_services_api():
     """
@@ -2324,9 +2678,22 @@ def search_services_api():
         delivery_time = request.args.get('delivery_time', '').strip()
         category = request.args.get('category', '').strip()
         sort_by = request.args.get('sort', 'newest')
-        
-        # 2. Base Query
-        query = Service.query.filter_by(is_active=True)
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', current_app.config['SERVICES_PER_PAGE'], type=int)
+        
+        # 2. Base Query, with per-service rating stats from one grouped
+        # subquery (instead of two review queries per service)
+        rating_sq = db.session.query(
+            Review.service_id,
+            func.avg(Review.rating).label('avg_rating'),
+            func.count(Review.id).label('review_count')
+        ).group_by(Review.service_id).subquery()
+        avg_rating = func.round(func.coalesce(rating_sq.c.avg_rating, 0), 1)
+        
+        query = Service.query.filter_by(is_active=True) \
+            .outerjoin(rating_sq, rating_sq.c.service_id == Service.id) \
+            .options(joinedload(Service.category), joinedload(Service.provider)) \
+            .add_columns(rating_sq.c.avg_rating, rating_sq.c.review_count)
         
         # 3. Apply SQL Filters (Filter Logic)
         if search_query:
@@ -2352,25 +2719,29 @@ def search_services_api():
             else:
                 query = query.join(Category).filter(Category.name.ilike(f'%{category}%'))
         
-        # Execute DB Query
-        services = query.all()
-        
-        # 4. Apply Python Filters (Syllabus: Lambda, Filter)
         if min_rating is not None:
-            # Filtering list using lambda
-            services = list(filter(lambda s: s.get_average_rating() >= min_rating, services))
-        
-        # 5. Apply Sorting (Syllabus: Logic, Sorted)
-        if sort_by == 'newest':
-            services = sorted(services, key=lambda s: s.created_at, reverse=True)
-        elif sort_by == 'popular':
-            services = sorted(services, key=lambda s: s.view_count, reverse=True)
-        elif sort_by == 'highest_rated':
-            services = sorted(services, key=lambda s: s.get_average_rating(), reverse=True)
-        elif sort_by == 'price_low':
-            services = sorted(services, key=lambda s: s.price)
-        elif sort_by == 'price_high':
-            services = sorted(services, key=lambda s: s.price, reverse=True)
+            # Same rounded average the service card shows
+            query = query.filter(avg_rating >= min_rating)
+        
+        # 4. Apply Sorting in SQL (dictionary dispatch: sort key -> ORDER BY)
+        # Service.id breaks ties, so LIMIT/OFFSET pages ("Load more") never
+        # repeat or skip a service; unknown keys fall back to newest
+        sort_orders = {
+            'newest': (Service.created_at.desc(), Service.id.desc()),
+            'popular': (Service.view_count.desc(), Service.id.desc()),
+            'highest_rated': (avg_rating.desc(), Service.id.desc()),
+            'price_low': (Service.price.asc(), Service.id.desc()),
+            'price_high': (Service.price.desc(), Service.id.desc())
+        }
+        query = query.order_by(*sort_orders.get(sort_by, sort_orders['newest']))
+        
+        # 5. Execute DB Query (one page: LIMIT/OFFSET) and attach the rating stats
+        pagination = query.paginate(page=page, per_page=per_page, max_per_page=SEARCH_API_MAX_PER_PAGE,
+                                    error_out=False)
+        services = []
+        for service, service_avg, review_count in pagination.items:
+            service.set_rating_stats(service_avg, review_count)
+            services.append(service)
         
         # 6. Transform Data for JSON (List Comprehension/Loops)
         services_data = []
@@ -2401,6 +2772,10 @@ def search_services_api():
         return jsonify({
             'success': True,
             'count': len(services_data),
+            'total': pagination.total,
+            'page': pagination.page,
+            'pages': pagination.pages,
+            'has_next': pagination.has_next,
             'services': services_data
         }), 200
         
@@ -2409,33 +2784,27 @@ def search_services_api():
 
 
 @api_bp.route('/services/filters/options', methods=['GET'])
+@public_json
 def get_filter_options():
-    """Get available filter options"""
+    """Get available filter options (both lists come from the cache)"""
     try:
-        categories = Category.query.all()
-        # Syllabus: List Comprehension
-        category_list = [{'id': c.id, 'name': c.name} for c in categories]
-        
-        # Syllabus: Set for unique values
-        delivery_times = db.session.query(Service.delivery_time).filter(
-            Service.is_active == True
-        ).distinct().all()
-        
-        # Flatten tuple list using list comprehension
-        delivery_time_list = sorted([dt[0] for dt in delivery_times if dt[0]])
-        
         return jsonify({
             'success': True,
             'options': {
-                'categories': category_list,
-                'delivery_times': delivery_time_list
+                'categories': category_manager.get_category_choices(),
+                'delivery_times': get_delivery_times()
             }
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# Suggestions returned per keystroke
+AUTOCOMPLETE_LIMIT = 5
+
+
 @api_bp.route('/services/autocomplete', methods=['GET'])
+@public_json
 def service_autocomplete_api():
     """Search suggestions API"""
     try:
@@ -2443,13 +2812,25 @@ def service_autocomplete_api():
         if len(query) < 2:
             return jsonify({'success': True, 'suggestions': []})
             
-        services = Service.query.filter(
-            Service.is_active == True,
-            Service.title.ilike(f'%{query}%')
-        ).limit(5).all()
-        
-        # Syllabus: List Comprehension
-        suggestions = [s.title for s in services]
+        # Prefix matches first: lower(title) LIKE 'q%' is served by the
+        # idx_service_title_prefix index on PostgreSQL (see init_db)
+        title_lower = func.lower(Service.title)
+        suggestions = list(db.session.execute(
+            select(Service.title).where(
+                Service.is_active == True,
+                title_lower.startswith(query.lower(), autoescape=True)
+            ).order_by(title_lower).limit(AUTOCOMPLETE_LIMIT)
+        ).scalars())
+        
+        # Top up with titles containing the text elsewhere (trigram index)
+        if len(suggestions) < AUTOCOMPLETE_LIMIT:
+            suggestions += db.session.execute(
+                select(Service.title).where(
+                    Service.is_active == True,
+                    Service.title.ilike(f'%{query}%'),
+                    ~title_lower.startswith(query.lower(), autoescape=True)
+                ).limit(AUTOCOMPLETE_LIMIT - len(suggestions))
+            ).scalars().all()
         
         return jsonify({'success': True, 'suggestions': suggestions})
     except Exception as e:
@@ -1,15 +1,34 @@
-from flask import Blueprint, request, jsonify, current_app
+import json
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, g
 # NOTE: If not using Flask-Login, adjust the following import and user logic
 from flask_login import current_user
 from chat_manager import chat_manager
 
 chat_bp = Blueprint('chat', __name__)
 
-@chat_bp.route('/ask', methods=['POST'])
-def ask():
+# User.user_type values the assistant tailors its answers to
+CHAT_ROLES = ('client', 'provider', 'admin')
+
+def _resolve_identity():
+    """Return (user_identity, user_role) for the current requester."""
+    if current_user.is_authenticated:
+        user_identity = f"user_{current_user.id}"
+        # Plain column read: one attribute, no per-request method probing
+        user_role = current_user.user_type if current_user.user_type in CHAT_ROLES else 'client'
+    else:
+        user_identity = f"ip_{request.remote_addr}"
+        user_role = 'guest'
+    return user_identity, user_role
+
+@chat_bp.before_request
+def _load_chat_identity():
+    """Gate every chat route on the feature flag and resolve the requester once."""
     if not current_app.config.get('ENABLE_ASKVERA'):
         return jsonify({"error": "Feature disabled"}), 404
-        
+    g.chat_identity, g.chat_role = _resolve_identity()
+
+@chat_bp.route('/ask', methods=['POST'])
+def ask():
     data = request.get_json()
     if not data or 'message' not in data:
         return jsonify({"error": "Message required"}), 400
@@ -17,38 +36,31 @@ def ask():
     user_message = data['message']
     context = data.get('context', {})
     
-    # Determine Identity (Edit this if your User model differs)
-    if hasattr(current_user, 'is_authenticated') and current_user.is_authenticated:
-        user_identity = f"user_{current_user.id}"
-        # Adjust 'is_provider' check to match your User model
-        if hasattr(current_user, 'is_provider') and current_user.is_provider():
-            user_role = 'provider'
-        elif hasattr(current_user, 'is_admin') and current_user.is_admin():
-            user_role = 'admin'
-        else:
-            user_role = 'client'
-    else:
-        user_identity = f"ip_{request.remote_addr}"
-        user_role = 'guest'
-        
-    result = chat_manager.get_response(user_message, context, user_identity, user_role)
+    result = chat_manager.get_response(user_message, context, g.chat_identity, g.chat_role)
     return jsonify(result)
 
+@chat_bp.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    """Same as /ask, but streams tokens as Server-Sent Events while the model writes."""
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return jsonify({"error": "Message required"}), 400
+        
+    user_message = data['message']
+    context = data.get('context', {})
+    user_identity, user_role = g.chat_identity, g.chat_role
+    
+    def generate():
+        for event in chat_manager.get_response_stream(user_message, context, user_identity, user_role):
+            yield f"data: {json.dumps(event)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}  # Don't let proxies buffer
+    )
+
 @chat_bp.route('/init', methods=['GET'])
 def init_chat():
-    if not current_app.config.get('ENABLE_ASKVERA'):
-        return jsonify({"error": "Feature disabled"}), 404
-
-    # Reuse role logic (ideal to refactor, but keeping inline to minimize diffs)
-    if hasattr(current_user, 'is_authenticated') and current_user.is_authenticated:
-        if hasattr(current_user, 'is_admin') and current_user.is_admin():
-            user_role = 'admin'
-        elif hasattr(current_user, 'is_provider') and current_user.is_provider():
-            user_role = 'provider'
-        else:
-            user_role = 'client'
-    else:
-        user_role = 'guest'
-        
-    suggestions = chat_manager.get_initial_suggestions(user_role)
+    suggestions = chat_manager.get_initial_suggestions(g.chat_role)
     return jsonify({"suggestions": suggestions})
@@ -64,6 +64,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
         messages.appendChild(wrapper);
         messages.scrollTop = messages.scrollHeight;
+        return msgDiv;
     }
 
     // Add visual typing indicator
@@ -104,19 +105,55 @@ document.addEventListener('DOMContentLoaded', () => {
         const typingId = showTyping();
 
         try {
-            const res = await fetch('/chat/ask', {
+            // Tokens arrive as Server-Sent Events so the reply renders while it is written
+            const res = await fetch('/chat/ask/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ message: text, context: { page: window.location.pathname } })
             });
-            const data = await res.json();
-            removeTyping(typingId);
-            appendMessage(data.response || data.error, 'ai');
+            if (!res.ok || !res.body) {
+                const data = await res.json();
+                removeTyping(typingId);
+                appendMessage(data.response || data.error, 'ai');
+                return;
+            }
 
-            // Handle suggestions if present
-            if (data.suggestions && data.suggestions.length > 0) {
-                appendSuggestions(data.suggestions);
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let reply = '';
+            let msgDiv = null;
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                // Each event is "data: {...}" followed by a blank line
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                for (const raw of events) {
+                    if (!raw.startsWith('data: ')) continue;
+                    const data = JSON.parse(raw.slice(6));
+
+                    if (data.token) {
+                        if (!msgDiv) {
+                            removeTyping(typingId);
+                            msgDiv = appendMessage('', 'ai');
+                        }
+                        reply += data.token;
+                        msgDiv.innerHTML = reply.replace(/\n/g, '<br>');
+                        messages.scrollTop = messages.scrollHeight;
+                    } else if (data.error) {
+                        removeTyping(typingId);
+                        appendMessage(data.error, 'ai');
+                    } else if (data.done && data.suggestions && data.suggestions.length > 0) {
+                        // Handle suggestions if present
+                        appendSuggestions(data.suggestions);
+                    }
+                }
             }
+            removeTyping(typingId);
         } catch (e) {
             removeTyping(typingId);
             appendMessage("I'm having trouble connecting right now.", 'ai');
@@ -0,0 +1,72 @@
+/**
+ * SkillVerse Dashboard Charts
+ * Draws the user and admin dashboard analytics with Chart.js from the JSON
+ * the server embeds in each <canvas data-chart="..."> (see routes.dashboard
+ * and routes.admin dashboard).
+ */
+
+'use strict';
+
+(function () {
+    const PIE_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF',
+                        '#FF9F40', '#C9CBCF', '#7CFC00', '#FF1493', '#00CED1'];
+
+    /**
+     * Build the Chart.js config for one chart spec
+     * spec: {type: 'line'|'bar'|'pie', title, label, xlabel, labels, values,
+     *        color, horizontal (bar only)}
+     */
+    function chartConfig(spec) {
+        const isPie = spec.type === 'pie';
+        const isBar = spec.type === 'bar';
+        const palette = PIE_COLORS.slice(0, spec.values.length);
+        const dataset = isPie
+            ? { data: spec.values, backgroundColor: palette }
+            : {
+                label: spec.label,
+                data: spec.values,
+                borderColor: isBar ? palette : spec.color,
+                backgroundColor: isBar ? palette : spec.color,
+                borderWidth: 2,
+                tension: 0
+            };
+
+        // Horizontal bars put the values on x and the categories on y
+        const categoryAxis = { title: { display: !!spec.xlabel || !isBar, text: spec.xlabel || 'Date' } };
+        const valueAxis = { title: { display: true, text: spec.label }, beginAtZero: true };
+        let scales = {};
+        if (!isPie) {
+            scales = spec.horizontal
+                ? { x: valueAxis, y: categoryAxis }
+                : { x: categoryAxis, y: valueAxis };
+        }
+
+        return {
+            type: spec.type,
+            data: { labels: spec.labels, datasets: [dataset] },
+            options: {
+                indexAxis: spec.horizontal ? 'y' : 'x',
+                responsive: true,
+                maintainAspectRatio: false,
+                plugins: {
+                    title: { display: true, text: spec.title, font: { weight: 'bold' } },
+                    legend: { display: isPie, position: 'bottom' }
+                },
+                scales: scales
+            }
+        };
+    }
+
+    function drawCharts() {
+        if (typeof Chart === 'undefined') return;
+
+        // Follow the page text colour so labels stay readable in dark mode
+        Chart.defaults.color = getComputedStyle(document.body).color;
+
+        document.querySelectorAll('canvas[data-chart]').forEach(canvas => {
+            new Chart(canvas, chartConfig(JSON.parse(canvas.dataset.chart)));
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', drawCharts);
+})();
@@ -0,0 +1,166 @@
+"""
+Cached Site Statistics for SkillVerse
+
+Landing/about page counters and category stats change rarely but are read
+on every page view, so they are served from Flask-Caching (Redis in
+production, in-process memory otherwise) and dropped whenever a commit
+changes the underlying rows.
+
+Author: SkillVerse Team
+Purpose: Keep aggregate COUNT queries off the hot path
+"""
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+from extensions import cache
+from models import db, User, Service, Review, Category
+
+# Cache keys and lifetimes (seconds)
+SITE_STATS_KEY = 'site_stats'
+SITE_STATS_TIMEOUT = 60
+CATEGORY_STATS_KEY = 'category_stats'
+CATEGORY_STATS_TIMEOUT = 600
+CATEGORY_CHOICES_KEY = 'all_categories'
+CATEGORY_CHOICES_TIMEOUT = 600
+RATING_BUNDLE_TIMEOUT = 600
+DELIVERY_TIMES_KEY = 'delivery_times'
+DELIVERY_TIMES_TIMEOUT = 600
+
+
+@cache.cached(timeout=SITE_STATS_TIMEOUT, key_prefix=SITE_STATS_KEY)
+def get_site_stats():
+    """
+    Get the platform-wide counters shown on the home and about pages
+    
+    Returns:
+        dict: total_users, total_services (active), total_reviews
+    """
+    # Three scalar subqueries in one SELECT: one round-trip instead of three
+    row = db.session.execute(select(
+        select(func.count(User.id)).scalar_subquery().label('users'),
+        select(func.count(Service.id)).filter_by(is_active=True).scalar_subquery().label('services'),
+        select(func.count(Review.id)).scalar_subquery().label('reviews')
+    )).one()
+    return {
+        'total_users': row.users,
+        'total_services': row.services,
+        'total_reviews': row.reviews
+    }
+
+
+@cache.memoize(timeout=RATING_BUNDLE_TIMEOUT)
+def get_rating_bundle(service_id):
+    """
+    Get the rating summary shown on a service's detail page
+    
+    Args:
+        service_id (int): Service ID
+        
+    Returns:
+        dict: average (float or None), count (int),
+              distribution (1-5 stars with counts)
+    """
+    # Count per rating in SQL (GROUP BY); average and total follow from it
+    counts = db.session.query(Review.rating, func.count(Review.id))\
+                       .filter_by(service_id=service_id)\
+                       .group_by(Review.rating).all()
+    
+    distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+    for rating, count in counts:
+        distribution[rating] += count
+    
+    total = sum(distribution.values())
+    average = sum(rating * count for rating, count in distribution.items()) / total if total else None
+    return {'average': average, 'count': total, 'distribution': distribution}
+
+
+@cache.cached(timeout=DELIVERY_TIMES_TIMEOUT, key_prefix=DELIVERY_TIMES_KEY)
+def get_delivery_times():
+    """
+    Get the distinct delivery times of active services (search filter options)
+    
+    Returns:
+        list: Sorted delivery time strings
+    """
+    rows = db.session.execute(
+        select(Service.delivery_time).where(Service.is_active == True).distinct()
+    ).scalars()
+    return sorted(dt for dt in rows if dt)
+
+
+def _pending_drops(target):
+    """
+    Cache keys and rating-bundle service ids to drop once target's session commits
+    
+    Mapper events fire at flush time, before the commit: deleting right
+    away would let a concurrent request re-cache the old values (kept for
+    the whole timeout), and would drop entries for writes later rolled back.
+    """
+    session = object_session(target)
+    return session.info.setdefault('stats_drops', (set(), set()))
+
+
+def _drop_site_stats(mapper, connection, target):
+    """Invalidate the cached site counters after a relevant write"""
+    _pending_drops(target)[0].add(SITE_STATS_KEY)
+
+
+def _drop_category_stats(mapper, connection, target):
+    """Invalidate the cached category stats after a relevant write"""
+    _pending_drops(target)[0].add(CATEGORY_STATS_KEY)
+
+
+def _drop_rating_bundle(mapper, connection, target):
+    """Invalidate the cached rating summary of the reviewed service"""
+    _pending_drops(target)[1].add(target.service_id)
+
+
+def _drop_delivery_times(mapper, connection, target):
+    """Invalidate the cached delivery time options after a service write"""
+    _pending_drops(target)[0].add(DELIVERY_TIMES_KEY)
+
+
+def _drop_category_choices(mapper, connection, target):
+    """Invalidate the cached category id/name list after a category write"""
+    _pending_drops(target)[0].add(CATEGORY_CHOICES_KEY)
+
+
+def _apply_drops(session):
+    """Delete the cache entries recorded during the flushes of this transaction"""
+    drops = session.info.pop('stats_drops', None)
+    if drops is None:
+        return
+    keys, service_ids = drops
+    if keys:
+        cache.delete_many(*keys)
+    for service_id in service_ids:
+        cache.delete_memoized(get_rating_bundle, service_id)
+
+
+def _discard_drops(session, previous_transaction=None):
+    """Forget recorded drops: the writes that caused them were rolled back"""
+    session.info.pop('stats_drops', None)
+
+
+event.listen(Session, 'after_commit', _apply_drops)
+event.listen(Session, 'after_rollback', _discard_drops)
+
+
+# New/removed users, services and reviews change the site counters;
+# services also change per-category counts (is_active flips on update)
+for _model in (User, Service, Review):
+    event.listen(_model, 'after_insert', _drop_site_stats)
+    event.listen(_model, 'after_delete', _drop_site_stats)
+event.listen(Service, 'after_update', _drop_site_stats)
+
+for _model in (Category, Service):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _drop_category_stats)
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Category, _event, _drop_category_choices)
+    event.listen(Service, _event, _drop_delivery_times)
+
+# Any review write changes that service's average and distribution
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Review, _event, _drop_rating_bundle)